@@ -0,0 +1,8 @@
+"""Offline benchmark suite for the scraper.
+
+    python -m bench record                  snapshot live pages into bench/fixtures
+    python -m bench run [--compare OLD]     benchmark against the local stand-in
+    python -m bench compare OLD NEW         diff two saved results files
+
+Nothing here touches the live retailer sites except `record`.
+"""
@@ -0,0 +1,132 @@
+"""Recorded product-page fixtures, with deterministic synthetic stand-ins.
+
+`python -m bench record` snapshots the live catalog pages into
+bench/fixtures/<retailer>/<product>.html and lists them in manifest.json.
+Any catalog entry without a recording is replaced by a synthetic page: a
+seeded, realistically sized document (large inline scripts, navigation and
+footer link lists, a recommendations grid) with the retailer's price and
+rating markup in the middle, so benchmarks stay reproducible before anything
+has been recorded. Results note which fixtures were synthetic.
+"""
+
+import json
+import os
+import random
+import re
+import zlib
+from datetime import datetime
+
+from scraper.catalog import load_catalog
+from scraper.config import CATALOG_PATH
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+# The repository's catalog, wherever the bench is run from
+CATALOG_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), CATALOG_PATH)
+MANIFEST_PATH = os.path.join(FIXTURE_DIR, 'manifest.json')
+SYNTHETIC_BYTES = 400 * 1024
+
+# Price/rating markup per retailer, laid out like the live pages
+_PRODUCT_MARKUP = {
+    'Apple': '<div class="rf-hero"><h1>Buy {product}</h1><span class="rf-price">From ${price}</span></div>',
+    'Sharaf DG': '<h1 class="product-title">{product}</h1><span class="product-price">AED {price:,}</span>'
+                 '<div class="rating-stars">4.2<span>{reviews}  Reviews</span></div>',
+    'Argos': '<h1 data-test="product-title">{product}</h1><span data-test="product-price">£{price}.00</span>'
+             '<span class="ProductRating-star">{reviews}</span>',
+    'Verizon': '<h1>{product}</h1><p>${monthly}/mo for 36 mos</p><p>4.2 out of 5 stars</p>',
+    'AT&T': '<h1>{product}</h1><div>${monthly}/mo</div><span class="rating-stars">4.4 out of 5</span>',
+}
+
+def slug(text):
+    return re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')
+
+def fixture_path(product, retailer):
+    return os.path.join(FIXTURE_DIR, slug(retailer), slug(product) + '.html')
+
+def load_manifest():
+    try:
+        with open(MANIFEST_PATH, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def synthetic_page(product, retailer, size=SYNTHETIC_BYTES):
+    """A deterministic page of about size bytes with the retailer's markup embedded"""
+    rng = random.Random(zlib.crc32(f'{retailer}/{product}'.encode()))
+    price = rng.randrange(699, 1600)
+    fields = {'product': product, 'price': price, 'monthly': f'{price / 36:.2f}', 'reviews': rng.randrange(10, 2000)}
+    words = ['apple', 'iphone', 'ipad', 'deal', 'trade', 'in', 'support', 'store', 'plan', 'offer', 'case', 'charger']
+
+    def filler(nbytes):
+        parts, total = [], 0
+        while total < nbytes:
+            href = '/' + '/'.join(rng.choice(words) for _ in range(3))
+            part = f'<li class="nav-item"><a href="{href}">{" ".join(rng.choice(words).title() for _ in range(2))}</a></li>'
+            parts.append(part)
+            total += len(part)
+        return '<ul>' + ''.join(parts) + '</ul>'
+
+    def script(nbytes):
+        state = [{'id': rng.randrange(10**6), 'name': rng.choice(words), 'flags': [rng.random() < 0.5 for _ in range(8)]}
+                 for _ in range(nbytes // 70)]
+        return '<script>window.__STATE__ = ' + json.dumps(state) + ';</script>'
+
+    tiles = ''.join(
+        f'<div class="tile"><a href="/p/{rng.randrange(10**6)}">{rng.choice(words).title()} accessory</a></div>'
+        for _ in range(size // 400)
+    )
+    html = (
+        '<!DOCTYPE html><html><head><title>' + product + '</title>' + script(size * 3 // 10) + '</head><body>'
+        + '<header>' + filler(size // 10) + '</header><main>'
+        + _PRODUCT_MARKUP[retailer].format(**fields)
+        + '<section class="recommendations">' + tiles + '</section></main>'
+        + '<footer>' + filler(size // 5) + '</footer></body></html>'
+    )
+    return html.encode('utf-8')
+
+def load_fixtures(catalog=None):
+    """Return {(product, retailer): (body, synthetic)} for every catalog entry (default: the repository's catalog)"""
+    catalog = load_catalog(CATALOG_FILE) if catalog is None else catalog
+    manifest = load_manifest()
+    fixtures = {}
+    for product, retailers in catalog.items():
+        for retailer in retailers:
+            entry = manifest.get(f'{retailer}/{product}')
+            if entry:
+                with open(os.path.join(FIXTURE_DIR, entry['file']), 'rb') as f:
+                    fixtures[product, retailer] = (f.read(), False)
+            else:
+                fixtures[product, retailer] = (synthetic_page(product, retailer), True)
+    return fixtures
+
+def record(catalog=None):
+    """Snapshot the live catalog pages into FIXTURE_DIR (politely, via the scraper's sessions)"""
+    from scraper.fetch import DEFAULT_MAX_BYTES, polite_stream, read_capped
+
+    catalog = load_catalog(CATALOG_FILE) if catalog is None else catalog
+    manifest = load_manifest()
+    for product, retailers in catalog.items():
+        for retailer, url in retailers.items():
+            try:
+                with polite_stream(url) as response:
+                    body, complete = read_capped(response, DEFAULT_MAX_BYTES)
+                    status = response.status_code
+            except Exception as e:
+                print(f"  {retailer} for {product} failed: {str(e)[:60]}")
+                continue
+            path = fixture_path(product, retailer)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(body)
+            manifest[f'{retailer}/{product}'] = {
+                'url': url,
+                'file': os.path.relpath(path, FIXTURE_DIR),
+                'status': status,
+                'bytes': len(body),
+                'complete': complete,
+                'recorded_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            print(f"  Recorded {retailer} for {product} ({len(body)} bytes, HTTP {status})")
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    with open(MANIFEST_PATH, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    return manifest
@@ -0,0 +1,130 @@
+"""Local HTTP stand-in for the retailer sites, serving fixtures with injected faults"""
+
+import random
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, urlsplit
+
+from .fixtures import slug
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients hang up early on purpose (capped or streamed reads, idle keep-alives)
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class StandIn:
+    """Serve fixture pages from 127.0.0.x, one loopback address per retailer.
+
+    Giving each retailer its own address keeps the scraper's per-host
+    budgets and sessions apart exactly as with the live sites. Every
+    response is delayed by latency plus up to jitter seconds; error_rate of
+    requests fail with a status drawn from error_statuses (429s and 503s
+    carry Retry-After: retry_after). With drip_bytes set, bodies are written
+    drip_bytes at a time with drip_delay seconds between writes. ETags allow
+    conditional GETs. Faults come from a seeded RNG, so a given request
+    sequence sees the same faults every time. outages maps retailers to a
+    status that every request to them returns, to simulate a blocked or
+    failing site.
+    """
+
+    def __init__(self, fixtures, latency=0.0, jitter=0.0, error_rate=0.0, error_statuses=(429, 503),
+                 retry_after=0, drip_bytes=None, drip_delay=0.0, outages=None, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.retry_after = retry_after
+        self.drip_bytes = drip_bytes
+        self.drip_delay = drip_delay
+        self.requests = 0
+        self.injected = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._hosts = {}
+        self._pages = {}
+        for (product, retailer), (body, _) in fixtures.items():
+            host = self._hosts.setdefault(retailer, f'127.0.0.{len(self._hosts) + 1}')
+            self._pages[host, '/' + quote(slug(product))] = (body, f'"{zlib.crc32(body):08x}"')
+        self._outages = {self._hosts[retailer]: status for retailer, status in (outages or {}).items()}
+        self._server = None
+
+    def url(self, product, retailer):
+        return f'http://{self._hosts[retailer]}:{self.port}/{quote(slug(product))}'
+
+    def catalog(self, fixtures):
+        """A catalog-shaped dict pointing every fixture at the stand-in"""
+        catalog = {}
+        for product, retailer in fixtures:
+            catalog.setdefault(product, {})[retailer] = self.url(product, retailer)
+        return catalog
+
+    def _plan(self):
+        """Draw (delay, error status or None) for one request"""
+        with self._lock:
+            self.requests += 1
+            delay = self.latency + self._rng.uniform(0, self.jitter)
+            status = None
+            if self._rng.random() < self.error_rate:
+                status = self._rng.choice(self.error_statuses)
+                self.injected += 1
+        return delay, status
+
+    def __enter__(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                delay, status = standin._plan()
+                time.sleep(delay)
+                # The local address the client dialled tells the retailers apart
+                host = self.connection.getsockname()[0]
+                page = standin._pages.get((host, urlsplit(self.path).path))
+                if page is None:
+                    status = status or 404
+                status = standin._outages.get(host, status)
+                if status:
+                    self.send_response(status)
+                    if status in (429, 503):
+                        self.send_header('Retry-After', str(standin.retry_after))
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                body, etag = page
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('ETag', etag)
+                self.end_headers()
+                step = standin.drip_bytes or len(body) or 1
+                for start in range(0, len(body), step):
+                    self.wfile.write(body[start:start + step])
+                    if standin.drip_bytes and standin.drip_delay:
+                        self.wfile.flush()
+                        time.sleep(standin.drip_delay)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = _Server(('', 0), Handler)
+        self.port = self._server.server_port
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,227 @@
+"""Offline benchmarks: parsing, fetch throughput and end-to-end runs against the stand-in"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from scraper import fetch
+from scraper.cli import run_scrape
+from scraper.extract import COMPILED_SPECS, extract_fields, stream_fields
+
+from .fixtures import load_fixtures, record
+from .standin import StandIn
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+# Stand-in settings per fetch scenario; 'stream' turns on STREAM_EXTRACT and
+# 'parse_workers' sets PARSE_WORKERS (pipeline mode)
+SCENARIOS = {
+    'clean': {'latency': 0.02, 'jitter': 0.01},
+    'clean-pipeline': {'latency': 0.02, 'jitter': 0.01, 'parse_workers': 4},
+    'flaky': {'latency': 0.02, 'jitter': 0.01, 'error_rate': 0.15, 'error_statuses': (429, 500, 503)},
+    'slow-drip': {'latency': 0.02, 'drip_bytes': 16 * 1024, 'drip_delay': 0.005},
+    'slow-drip-stream': {'latency': 0.02, 'drip_bytes': 16 * 1024, 'drip_delay': 0.005, 'stream': True},
+    'partial-outage': {'latency': 0.02, 'jitter': 0.01, 'outages': {'AT&T': 503}},
+}
+
+@contextlib.contextmanager
+def _workdir():
+    """Run in a fresh temporary directory so history and cache start empty"""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            yield directory
+        finally:
+            os.chdir(cwd)
+
+def _peak_kb(func, *args):
+    tracemalloc.start()
+    try:
+        func(*args)
+        return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    finally:
+        tracemalloc.stop()
+
+def bench_parse(fixtures, repeat=5):
+    """Median per-page parse time, throughput and peak memory of each retailer's extractor"""
+    results = {}
+    for retailer, spec in COMPILED_SPECS.items():
+        bodies = [body for (_, name), (body, _) in fixtures.items() if name == retailer]
+        if not bodies:
+            continue
+        total_bytes = sum(len(body) for body in bodies)
+        modes = {
+            'tree': lambda body: extract_fields(body, spec),
+            'stream': lambda body: stream_fields((body[i:i + fetch.CHUNK_SIZE] for i in range(0, len(body), fetch.CHUNK_SIZE)),
+                                                 spec, len(body))[:2],
+        }
+        results[retailer] = {'pages': len(bodies), 'bytes': total_bytes}
+        for mode, extract in modes.items():
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                fields = [extract(body) for body in bodies]
+                timings.append(time.perf_counter() - start)
+            elapsed = statistics.median(timings)
+            results[retailer][mode] = {
+                'ms_per_page': round(elapsed / len(bodies) * 1000, 3),
+                'mb_per_s': round(total_bytes / elapsed / 1e6, 2),
+                'peak_kb': max(_peak_kb(extract, body) for body in bodies),
+                'prices_found': sum(price is not None for price, _ in fields),
+                'ratings_found': sum(rating is not None for _, rating in fields),
+            }
+    return results
+
+def bench_fetch(fixtures, scenario):
+    """Throughput of scrape_all over the catalog served by a stand-in configured per scenario"""
+    settings = dict(SCENARIOS[scenario])
+    stream = settings.pop('stream', False)
+    parse_workers = settings.pop('parse_workers', 0)
+    total_bytes = sum(len(body) for body, _ in fixtures.values())
+    previous = fetch.STREAM_EXTRACT, fetch.PARSE_WORKERS
+    fetch.STREAM_EXTRACT, fetch.PARSE_WORKERS = stream, parse_workers
+    fetch.reset_hosts()
+    if parse_workers:
+        # Start the extractor processes outside the timed section
+        pool = fetch.parse_pool()
+        for future in [pool.submit('Apple', '', '', b'<html></html>', lambda data: data) for _ in range(parse_workers)]:
+            future.result()
+    try:
+        with StandIn(fixtures, **settings) as standin, _workdir():
+            catalog = standin.catalog(fixtures)
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                rows = fetch.scrape_all(catalog)
+            elapsed = time.perf_counter() - start
+    finally:
+        fetch.STREAM_EXTRACT, fetch.PARSE_WORKERS = previous
+    return {
+        'pages': len(rows),
+        'seconds': round(elapsed, 3),
+        'pages_per_s': round(len(rows) / elapsed, 2),
+        'mb_per_s': round(total_bytes / elapsed / 1e6, 2),
+        'requests': standin.requests,
+        'injected_errors': standin.injected,
+        'error_rows': sum((row['Original Price'] or '').startswith('Error') for row in rows),
+        'skipped_rows': sum((row['Original Price'] or '').startswith('Skipped') for row in rows),
+    }
+
+def bench_end_to_end(fixtures):
+    """Wall time of run_scrape cold (empty cache and history) and warm, plus peak memory of a cold run"""
+    results = {}
+    fetch.reset_hosts()
+    with StandIn(fixtures, **SCENARIOS['clean']) as standin:
+        catalog = standin.catalog(fixtures)
+        with _workdir(), contextlib.redirect_stdout(io.StringIO()):
+            for phase in ('cold', 'warm'):
+                start = time.perf_counter()
+                run_scrape(catalog)
+                results[f'{phase}_seconds'] = round(time.perf_counter() - start, 3)
+        with _workdir(), contextlib.redirect_stdout(io.StringIO()):
+            results['cold_peak_kb'] = _peak_kb(run_scrape, catalog)
+    results['max_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return results
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(__file__), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def run_suite(repeat=5, scenarios=tuple(SCENARIOS), min_interval=0.0):
+    """Run every benchmark and return the results as one JSON-serializable dict.
+
+    min_interval replaces the politeness interval for the stand-in hosts so
+    runs measure the engine rather than the configured sleeps.
+    """
+    fixtures = load_fixtures()
+    for index in range(1, len({retailer for _, retailer in fixtures}) + 1):
+        fetch.HOST_BUDGETS[f'127.0.0.{index}'] = {'min_interval': min_interval}
+    return {
+        'commit': _commit(),
+        'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'python': platform.python_version(),
+        'settings': {'repeat': repeat, 'min_interval': min_interval},
+        'fixtures': {
+            'pages': len(fixtures),
+            'bytes': sum(len(body) for body, _ in fixtures.values()),
+            'synthetic': sum(synthetic for _, synthetic in fixtures.values()),
+        },
+        'parse': bench_parse(fixtures, repeat),
+        'fetch': {scenario: bench_fetch(fixtures, scenario) for scenario in scenarios},
+        'end_to_end': bench_end_to_end(fixtures),
+    }
+
+def save_results(results, directory=RESULTS_DIR):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{datetime.now():%Y%m%d-%H%M%S}-{results['commit']}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=1)
+    return path
+
+def _flatten(results, prefix=''):
+    for key, value in results.items():
+        if isinstance(value, dict):
+            yield from _flatten(value, f'{prefix}{key}.')
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield f'{prefix}{key}', value
+
+def compare(old, new, threshold=0.10):
+    """Print every metric of two result dicts side by side, flagging regressions beyond threshold"""
+    old_metrics = dict(_flatten(old))
+    print(f"{'metric':55} {old.get('commit', 'old'):>12} {new.get('commit', 'new'):>12}  change")
+    for key, value in _flatten(new):
+        if key.startswith('settings.') or key not in old_metrics:
+            continue
+        before = old_metrics[key]
+        change = (value - before) / before if before else 0.0
+        higher_is_better = key.endswith('_per_s') or key.endswith('_found')
+        worse = -change if higher_is_better else change
+        timed = key.endswith(('_per_s', 'seconds', 'ms_per_page', '_kb', '_found'))
+        flag = '  REGRESSION' if timed and worse > threshold else ''
+        print(f"{key:55} {before:>12} {value:>12}  {change:+.1%}{flag}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m bench', description='Offline scraper benchmarks')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    command = commands.add_parser('run', help='run the benchmarks and save the results')
+    command.add_argument('--repeat', type=int, default=5, help='parse repetitions per page (median is kept)')
+    command.add_argument('--scenario', action='append', choices=list(SCENARIOS), help='fetch scenario (repeatable, default all)')
+    command.add_argument('--min-interval', type=float, default=0.0, help='per-host politeness interval for the stand-in')
+    command.add_argument('--compare', help='earlier results file to compare against')
+    command.add_argument('--no-save', action='store_true')
+
+    command = commands.add_parser('record', help='snapshot the live catalog pages into fixtures')
+
+    command = commands.add_parser('compare', help='compare two saved results files')
+    command.add_argument('old')
+    command.add_argument('new')
+    command.add_argument('--threshold', type=float, default=0.10)
+
+    args = parser.parse_args(argv)
+    if args.command == 'record':
+        record()
+    elif args.command == 'compare':
+        with open(args.old, encoding='utf-8') as f_old, open(args.new, encoding='utf-8') as f_new:
+            compare(json.load(f_old), json.load(f_new), args.threshold)
+    else:
+        results = run_suite(args.repeat, args.scenario or tuple(SCENARIOS), args.min_interval)
+        print(json.dumps(results, indent=1))
+        if not args.no_save:
+            print(f"Results saved to {save_results(results)}")
+        if args.compare:
+            with open(args.compare, encoding='utf-8') as f:
+                compare(json.load(f), results)
@@ -0,0 +1,6 @@
+"""Apple product price scraper: fetch, extract, normalize, store and report.
+
+Importing the package or any stage module has no side effects; pandas,
+pyarrow and openpyxl are only imported by the functions that use them. See
+scraper.cli for the command-line entry points.
+"""
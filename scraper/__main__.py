@@ -0,0 +1,5 @@
+from .cli import main
+
+# Guarded so the parse pool's spawned processes can import it without running a command
+if __name__ == '__main__':
+    main()
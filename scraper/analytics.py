@@ -0,0 +1,192 @@
+"""Running price aggregates folded in one run at a time"""
+
+import json
+import os
+
+from .config import ANALYTICS_PATH, HISTORY_DIR, RUNS_PATH
+from .delta import load_runs, snapshot_history
+from .normalize import PRICE_STATUSES
+from .store import HISTORY_COLUMNS, read_history
+
+PRICE_STATUS_LABELS = {
+    'ok': 'OK',
+    'not_found': 'Not found',
+    'unparseable': 'Unreadable',
+    'unknown_currency': 'Unknown currency',
+    'error': 'N/A',
+    'skipped': 'Skipped',
+    'quarantined': 'Quarantined',
+}
+
+class AnalyticsState:
+    """Running aggregates over the price history, folded in one run at a time.
+
+    Keeps min/max/sum/count of USD prices per product x retailer across every
+    run, plus the latest row per product x retailer (every history column).
+    Folding a run costs O(rows in the run), and every report view, the latest
+    run's rows and the delta-mode comparison are built from this state, so
+    none of them depends on how long the history is.
+    """
+
+    def __init__(self, stats=None, latest=None, last_run=None):
+        self.stats = stats or {}
+        self.latest = latest or {}
+        self.last_run = last_run
+
+    @classmethod
+    def load(cls, path=ANALYTICS_PATH):
+        try:
+            with open(path, encoding='utf-8') as f:
+                return cls(**json.load(f))
+        except FileNotFoundError:
+            return cls()
+
+    def save(self, path=ANALYTICS_PATH):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'stats': self.stats, 'latest': self.latest, 'last_run': self.last_run}, f, indent=1)
+        os.replace(tmp_path, path)
+
+    def fold(self, rows):
+        """Fold typed history rows (see normalize_frame) newer than last_run into the state"""
+        import pandas as pd
+
+        if self.last_run is not None:
+            rows = rows[rows['run_datetime'] > pd.Timestamp(self.last_run)]
+        for row in rows.sort_values('run_datetime', kind='stable').itertuples(index=False):
+            product, retailer = str(row.product), str(row.retailer)
+            run_datetime = row.run_datetime.strftime("%Y-%m-%d %H:%M:%S")
+            price = None if pd.isna(row.price_usd) else float(row.price_usd)
+
+            if price is not None:
+                agg = self.stats.setdefault(product, {}).setdefault(
+                    retailer, {'min': price, 'max': price, 'sum': 0.0, 'count': 0})
+                agg['min'] = min(agg['min'], price)
+                agg['max'] = max(agg['max'], price)
+                agg['sum'] += price
+                agg['count'] += 1
+
+            if price is not None:
+                price_display = f"${price:.2f}/mo" if row.monthly else f"${price:.2f}"
+            else:
+                price_display = PRICE_STATUS_LABELS[row.status]
+            rating = None if pd.isna(row.rating) else float(row.rating)
+            review_count = None if pd.isna(row.review_count) else int(row.review_count)
+
+            self.latest.setdefault(product, {})[retailer] = {
+                'run_datetime': run_datetime,
+                'url': None if pd.isna(row.url) else str(row.url),
+                'original_price': None if pd.isna(row.original_price) else str(row.original_price),
+                'price': None if pd.isna(row.price) else float(row.price),
+                'currency': None if pd.isna(row.currency) else str(row.currency),
+                'price_usd': price,
+                'monthly': bool(row.monthly),
+                'price_display': price_display,
+                'rating_text': None if pd.isna(row.rating_text) else str(row.rating_text),
+                'rating': rating,
+                'review_count': review_count,
+                'status': row.status,
+            }
+            self.last_run = max(self.last_run or run_datetime, run_datetime)
+        return self
+
+    def latest_frame(self):
+        """Latest row per product x retailer as a DataFrame"""
+        import pandas as pd
+
+        rows = [
+            {'Product': product, 'Retailer': retailer, **latest}
+            for product, retailers in self.latest.items()
+            for retailer, latest in retailers.items()
+        ]
+        return pd.DataFrame(rows, columns=[
+            'Product', 'Retailer', 'run_datetime', 'price_usd', 'monthly',
+            'price_display', 'rating', 'review_count', 'status',
+        ])
+
+    def run_frame(self, run_datetime=None):
+        """Typed history rows (see normalize_frame) of the latest values stamped at run_datetime (default: last_run)"""
+        import pandas as pd
+
+        run_datetime = run_datetime or self.last_run
+        rows = [
+            {**latest, 'product': product, 'retailer': retailer}
+            for product, retailers in self.latest.items()
+            for retailer, latest in retailers.items()
+            if latest['run_datetime'] == run_datetime
+        ]
+        frame = pd.DataFrame(rows, columns=HISTORY_COLUMNS)
+        return frame.astype({
+            'run_datetime': 'datetime64[s]', 'product': 'category', 'retailer': 'category', 'url': 'string',
+            'original_price': 'string', 'price': float, 'currency': 'category', 'monthly': bool,
+            'price_usd': float, 'rating_text': 'string', 'rating': float, 'review_count': 'Int64',
+            'status': pd.CategoricalDtype(PRICE_STATUSES),
+        })
+
+    def price_table(self):
+        return self.latest_frame().pivot(index='Product', columns='Retailer', values='price_display')
+
+    def rating_table(self):
+        import pandas as pd
+
+        latest = self.latest_frame()
+        latest['rating_display'] = [
+            ' '.join(part for part in (
+                '' if pd.isna(rating) else f"{rating:g}",
+                '' if pd.isna(count) else f"({count:.0f} reviews)",
+            ) if part)
+            for rating, count in zip(latest['rating'], latest['review_count'])
+        ]
+        return latest.pivot(index='Product', columns='Retailer', values='rating_display')
+
+    def price_analysis(self):
+        """Min/max/mean/count of the latest upfront USD prices per product (monthly plans are not comparable)"""
+        latest = self.latest_frame()
+        analysis = latest[latest['price_usd'].notna() & ~latest['monthly'].astype(bool)].groupby('Product')['price_usd'].agg(
+            ['min', 'max', 'mean', 'count']).round(2)
+        analysis.columns = ['Min Price (USD)', 'Max Price (USD)', 'Avg Price (USD)', 'Retailers with Price']
+        return analysis
+
+    def history_stats(self):
+        """Min/max/mean/count of USD prices per product x retailer over all runs"""
+        import pandas as pd
+
+        rows = [
+            {'Product': product, 'Retailer': retailer, 'Min Price (USD)': agg['min'],
+             'Max Price (USD)': agg['max'], 'Avg Price (USD)': agg['sum'] / agg['count'],
+             'Runs with Price': agg['count']}
+            for product, retailers in sorted(self.stats.items())
+            for retailer, agg in sorted(retailers.items())
+        ]
+        return pd.DataFrame(rows, columns=['Product', 'Retailer', 'Min Price (USD)', 'Max Price (USD)',
+                                           'Avg Price (USD)', 'Runs with Price']).round(2)
+
+    def best_deals(self):
+        """Return {product: (retailer, usd_price)} for the lowest latest upfront price"""
+        deals = {}
+        for product, retailers in self.latest.items():
+            priced = [(latest['price_usd'], retailer) for retailer, latest in retailers.items()
+                      if latest['price_usd'] is not None and not latest['monthly']]
+            if priced:
+                price, retailer = min(priced)
+                deals[product] = (retailer, price)
+        return deals
+
+    def retailer_summary(self):
+        """Products checked and prices/ratings found per retailer in the latest rows"""
+        latest = self.latest_frame()
+        latest['price_found'] = latest['price_usd'].notna()
+        latest['rating_found'] = latest['rating'].notna()
+        summary = latest.groupby('Retailer').agg(
+            {'Product': 'count', 'price_found': 'sum', 'rating_found': 'sum'})
+        summary.columns = ['Total Products', 'Prices Found', 'Ratings Found']
+        return summary
+
+def rebuild_analytics(root=HISTORY_DIR, runs_path=RUNS_PATH):
+    """Build the running aggregates from scratch over the full history.
+
+    Delta runs are expanded back to full per-run rows first, so the result
+    matches folding every run as it happened.
+    """
+    return AnalyticsState().fold(snapshot_history(read_history(root), load_runs(runs_path)))
@@ -0,0 +1,40 @@
+"""The product catalog: which URL to scrape for each product x retailer"""
+
+import csv
+import json
+
+from .config import CATALOG_PATH
+from .specs import RETAILER_SPECS
+
+def load_catalog(path=CATALOG_PATH):
+    """Load {product: {retailer: url}} from a JSON catalog or a product,retailer,url CSV.
+
+    Retailers are RETAILER_SPECS keys; entries for unknown retailers raise
+    ValueError rather than failing later mid-run.
+    """
+    with open(path, encoding='utf-8', newline='') as f:
+        if path.endswith('.csv'):
+            catalog = {}
+            for row in csv.DictReader(f):
+                catalog.setdefault(row['product'], {})[row['retailer']] = row['url']
+        else:
+            catalog = json.load(f)
+    unknown = {retailer for retailers in catalog.values() for retailer in retailers} - set(RETAILER_SPECS)
+    if unknown:
+        raise ValueError(f"{path}: unknown retailers {sorted(unknown)}")
+    return catalog
+
+def select_catalog(products=None, retailers=None, catalog=None):
+    """The catalog (default: the one at CATALOG_PATH) narrowed to the given product names and retailer keys.
+
+    Product names not in the catalog raise ValueError listing the known ones.
+    """
+    catalog = load_catalog() if catalog is None else catalog
+    unknown = [product for product in products or () if product not in catalog]
+    if unknown:
+        raise ValueError(f"unknown products {unknown}; the catalog has {sorted(catalog)}")
+    return {
+        product: {retailer: url for retailer, url in urls.items() if not retailers or retailer in retailers}
+        for product, urls in catalog.items()
+        if not products or product in products
+    }
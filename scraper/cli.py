@@ -0,0 +1,521 @@
+"""Command-line entry points, one per pipeline stage.
+
+    python -m scraper run                 scrape, store and fold one run
+    python -m scraper run --delta         the same, storing only changed rows and price events
+    python -m scraper enqueue             queue a run for sharded workers
+    python -m scraper work --shard i/N    scrape one shard of the queued run
+    python -m scraper merge               store the queued run once every shard is done
+    python -m scraper queue-status        task counts of the queued run
+    python -m scraper fetch               scrape and print raw rows, store nothing
+    python -m scraper extract SPEC FILE   extract price/rating from a saved page
+    python -m scraper profile SPEC URL    profile scraping one URL (cProfile or pyinstrument)
+    python -m scraper report              print the latest stored run and export its views
+    python -m scraper query ...           latest/cheapest/series/daily-min/movers from the price index
+    python -m scraper migrate             import the legacy CSV log
+    python -m scraper renormalize         re-normalize the stored raw text
+    python -m scraper reconvert           recompute USD prices at run-date rates
+    python -m scraper rebuild-analytics   rebuild the running aggregates and price index
+
+Every stage imports only what it needs, so e.g. report never loads requests,
+lxml or BeautifulSoup.
+"""
+
+import argparse
+import json
+import os
+from datetime import date
+
+from .catalog import load_catalog, select_catalog
+from .config import (ANALYTICS_PATH, CATALOG_PATH, EVENTS_PATH, HISTORY_DIR, INDEX_PATH, LOG_PATH,
+                     METRICS_PATH, QUARANTINE_PATH, QUEUE_PATH, RUNS_PATH)
+from .specs import RETAILER_SPECS
+from .workqueue import LEASE_BATCH, LEASE_SECONDS
+
+def print_banner(catalog):
+    from .normalize import default_rate_provider
+
+    rates = default_rate_provider()
+    print("=" * 90)
+    print("APPLE PRODUCTS WEB SCRAPING ASSIGNMENT")
+    print("=" * 90)
+    print("\nProduct Category: Consumer Electronics (Apple Devices)")
+    print(f"Number of Products: {len(catalog)}")
+    print(f"Number of Retailers: {len(RETAILER_SPECS)} ({', '.join(RETAILER_SPECS)})")
+    print(f"Total Data Points: {sum(len(urls) for urls in catalog.values())}")
+    print("\nCurrency Conversion Rates:")
+    print(f"  1 AED = ${rates.rate('AED', date.today())} USD")
+    print(f"  1 GBP = ${rates.rate('GBP', date.today())} USD")
+    print("\n" + "=" * 90)
+
+def store_run(all_data, run_datetime, delta=False, refetch=True):
+    """Validate one run's scraped rows, append them to the history and fold them into the analytics.
+
+    Rows failing validation are re-fetched once (unless refetch is off) and
+    quarantined if they still fail. With delta, only rows that changed since
+    the latest stored value are written, and price drops/rises are appended
+    to EVENTS_PATH. Returns the typed run, or None when there were no rows.
+    A run no newer than the latest stored one raises ValueError: the folds
+    only take newer rows, and later delta runs were stored against state
+    that did not include it.
+    """
+    if not all_data:
+        print(f"No rows to store for run {run_datetime}")
+        return None
+
+    import pandas as pd
+
+    from .analytics import AnalyticsState, rebuild_analytics
+    from .delta import LatestIndex, append_events, append_run
+    from .metrics import timed
+    from .normalize import normalize_frame
+    from .query import PriceIndex, rebuild_index
+    from .store import migrate_csv_log, write_history
+    from .validate import check_run, quarantine, refetch_catalog
+
+    for data in all_data:
+        data["Run Datetime"] = run_datetime
+
+    df_run = pd.DataFrame(all_data)
+
+    if not os.path.isdir(HISTORY_DIR) and os.path.exists(LOG_PATH):
+        with timed('migrate'):
+            migrated = migrate_csv_log(LOG_PATH, HISTORY_DIR)
+        print(f"Migrated {migrated} rows from {LOG_PATH} to {HISTORY_DIR}")
+
+    with timed('normalize'):
+        typed_run = normalize_frame(df_run)
+
+    # The running state (seeded from the full history once) feeds validation, the diff and the folds below
+    with timed('load_state'):
+        analytics = AnalyticsState.load(ANALYTICS_PATH)
+        if analytics.last_run is None:
+            analytics = rebuild_analytics(HISTORY_DIR)
+        index = PriceIndex.load(INDEX_PATH)
+        if index.last_run is None:
+            index = rebuild_index(HISTORY_DIR)
+    latest = max(analytics.last_run or '', index.last_run or '')
+    if run_datetime <= latest:
+        raise ValueError(f"Run {run_datetime} is not newer than the latest stored run {latest}")
+
+    with timed('validate'):
+        suspicious = check_run(typed_run, index)
+    if suspicious and refetch:
+        from .fetch import response_cache, scrape_all
+
+        print(f"Re-fetching {len(suspicious)} suspicious URLs")
+        with timed('refetch'):
+            catalog = refetch_catalog(typed_run, suspicious)
+            for urls in catalog.values():
+                for url in urls.values():
+                    response_cache.forget(url)
+            rows = scrape_all(catalog)
+            for data in rows:
+                data["Run Datetime"] = run_datetime
+            retyped = normalize_frame(pd.DataFrame(rows))
+            labels = {(str(typed_run.at[label, 'product']), str(typed_run.at[label, 'retailer'])): label
+                      for label in suspicious}
+            retyped.index = [labels[str(product), str(retailer)]
+                             for product, retailer in zip(retyped['product'], retyped['retailer'])]
+            typed_run = pd.concat([typed_run.drop(index=retyped.index), retyped]).sort_index()
+            for column in ('product', 'retailer', 'currency'):
+                typed_run[column] = typed_run[column].astype('category')
+        with timed('validate'):
+            suspicious = check_run(typed_run.loc[retyped.index], index)
+    if suspicious:
+        typed_run = quarantine(typed_run, suspicious, QUARANTINE_PATH)
+        print(f"Quarantined {len(suspicious)} rows to {QUARANTINE_PATH}")
+
+    if delta:
+        with timed('diff'):
+            changed, events = LatestIndex.from_state(analytics, index).diff(typed_run)
+        with timed('store'):
+            saved = write_history(typed_run[changed], HISTORY_DIR)
+            append_events(events, EVENTS_PATH)
+        print(f"Saved {saved} changed rows to {HISTORY_DIR} at {run_datetime} "
+              f"({len(typed_run) - saved} unchanged, {len(events)} price events)")
+    else:
+        with timed('store'):
+            saved = write_history(typed_run, HISTORY_DIR)
+        print(f"Saved {saved} rows to {HISTORY_DIR} at {run_datetime}")
+    append_run(typed_run, run_datetime, saved, delta, RUNS_PATH)
+
+    # Fold this run into the running aggregates and the price index
+    with timed('analytics'):
+        analytics.fold(typed_run)
+        analytics.save(ANALYTICS_PATH)
+    with timed('index'):
+        index.fold(typed_run)
+        index.save(INDEX_PATH)
+    return typed_run
+
+def run_scrape(catalog=None, delta=False, resume=False, queue_path=QUEUE_PATH):
+    """Scrape the catalog once through the work queue, then store and fold the run.
+
+    With resume, the latest unmerged run in the queue is finished instead of
+    starting a new one, skipping the URLs it already completed.
+    """
+    from .metrics import RunMetrics, timed
+    from .workqueue import WorkQueue, work
+
+    queue = WorkQueue(queue_path)
+    run_datetime = queue.open_run() if resume else None
+    if run_datetime is None:
+        run_datetime = queue.enqueue(load_catalog() if catalog is None else catalog)
+    else:
+        print(f"Resuming run {run_datetime} ({queue.counts(run_datetime).get('done', 0)} URLs already done)")
+    print_banner(queue.catalog(run_datetime))
+    with RunMetrics() as run_metrics:
+        # Retailers in parallel, each host within its politeness budget
+        with timed('scrape'):
+            work(queue, run_datetime)
+        try:
+            typed_run = store_run(queue.results(run_datetime), run_datetime, delta)
+        except ValueError as e:
+            raise SystemExit(f"{e}; its tasks stay in {queue.path}")
+        queue.mark_merged(run_datetime)
+    queue.close()
+
+    print(f"Metrics for {len(run_metrics.traces)} URLs appended to {run_metrics.write(run_datetime, METRICS_PATH)}")
+    return typed_run
+
+def _save_rebuilt_analytics():
+    from .analytics import rebuild_analytics
+    from .query import rebuild_index
+
+    rebuild_analytics(HISTORY_DIR).save(ANALYTICS_PATH)
+    rebuild_index(HISTORY_DIR).save(INDEX_PATH)
+    print(f"Rebuilt {ANALYTICS_PATH} and {INDEX_PATH}")
+
+def _configure_fetch(fetch, args):
+    fetch.STREAM_EXTRACT = args.stream or fetch.STREAM_EXTRACT
+    if args.parse_workers is not None:
+        fetch.PARSE_WORKERS = args.parse_workers
+    fetch.render.RENDER_ENABLED = args.render or fetch.render.RENDER_ENABLED
+
+def _selected_catalog(args):
+    """The --catalog narrowed by --product/--retailer; exits if a product is unknown or nothing is left"""
+    try:
+        catalog = select_catalog(args.product, args.retailer, load_catalog(args.catalog))
+    except ValueError as e:
+        raise SystemExit(str(e))
+    if not any(catalog.values()):
+        raise SystemExit(f"No URLs in {args.catalog} for the selected products and retailers")
+    return catalog
+
+def cmd_run(args):
+    from . import fetch
+
+    _configure_fetch(fetch, args)
+    run_scrape(_selected_catalog(args), delta=args.delta, resume=args.resume, queue_path=args.queue)
+
+def cmd_fetch(args):
+    from . import fetch
+
+    _configure_fetch(fetch, args)
+    for row in fetch.scrape_all(_selected_catalog(args)):
+        print(json.dumps(row, ensure_ascii=False))
+
+def cmd_enqueue(args):
+    from .workqueue import WorkQueue
+
+    catalog = _selected_catalog(args)
+    queue = WorkQueue(args.queue)
+    run_datetime = queue.enqueue(catalog)
+    print(f"Enqueued run {run_datetime} with {sum(queue.counts(run_datetime).values())} URLs in {args.queue}")
+
+def _queued_run(queue, run_datetime):
+    run_datetime = run_datetime or queue.open_run()
+    if run_datetime is None:
+        raise SystemExit(f"No unmerged run in {queue.path}; enqueue one first")
+    return run_datetime
+
+def cmd_work(args):
+    from . import fetch
+    from .metrics import RunMetrics
+    from .workqueue import WorkQueue, parse_shard, work
+
+    _configure_fetch(fetch, args)
+    try:
+        shard = parse_shard(args.shard)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    queue = WorkQueue(args.queue)
+    run_datetime = _queued_run(queue, args.run)
+    hosts = queue.host_count(run_datetime)
+    if shard[1] > hosts:
+        raise SystemExit(f"Run {run_datetime} has {hosts} hosts, so it splits into at most {hosts} shards")
+    with RunMetrics() as run_metrics:
+        done = work(queue, run_datetime, shard, args.worker, args.batch, args.lease)
+    print(f"Shard {args.shard} of run {run_datetime}: scraped {done} URLs, {queue.counts(run_datetime, shard)}")
+    if run_metrics.traces:
+        path = run_metrics.write(run_datetime, METRICS_PATH, shard=args.shard)
+        print(f"Metrics for {len(run_metrics.traces)} URLs appended to {path}")
+
+def cmd_merge(args):
+    from .metrics import RunMetrics
+    from .workqueue import WorkQueue
+
+    queue = WorkQueue(args.queue)
+    for path in args.absorb or ():
+        print(f"Absorbed {queue.absorb(path)} done tasks from {path}")
+    run_datetime = _queued_run(queue, args.run)
+    if queue.is_merged(run_datetime):
+        raise SystemExit(f"Run {run_datetime} is already merged")
+    counts = queue.counts(run_datetime)
+    unfinished = sum(counts.values()) - counts.get('done', 0)
+    if unfinished and not args.partial:
+        raise SystemExit(f"Run {run_datetime} has {unfinished} unfinished URLs ({counts}); "
+                         f"run the remaining shards or pass --partial")
+    if not counts.get('done'):
+        raise SystemExit(f"Run {run_datetime} has no finished URLs to merge ({counts})")
+    with RunMetrics() as run_metrics:
+        try:
+            store_run(queue.results(run_datetime), run_datetime, args.delta)
+        except ValueError as e:
+            raise SystemExit(f"{e}; its tasks stay in {queue.path}")
+        queue.mark_merged(run_datetime)
+    run_metrics.write(run_datetime, METRICS_PATH)
+
+def cmd_queue_status(args):
+    from .workqueue import WorkQueue
+
+    queue = WorkQueue(args.queue)
+    run_datetime = _queued_run(queue, args.run)
+    print(f"Run {run_datetime}: {queue.counts(run_datetime)}")
+    if args.shards:
+        for index in range(args.shards):
+            print(f"  shard {index}/{args.shards}: {queue.counts(run_datetime, (index, args.shards))}")
+
+def cmd_extract(args):
+    from .extract import extract_record
+
+    with open(args.file, 'rb') as f:
+        content = f.read()
+    print(json.dumps(extract_record(args.retailer, args.url, args.product, content), ensure_ascii=False))
+
+def cmd_profile(args):
+    import tempfile
+
+    from . import fetch
+    from .metrics import RunMetrics
+
+    fetch.STREAM_EXTRACT = args.stream or fetch.STREAM_EXTRACT
+    if not args.use_cache:
+        fetch.response_cache = fetch.ResponseCache(directory=tempfile.mkdtemp())
+    with RunMetrics() as run_metrics:
+        if args.profiler == 'pyinstrument':
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                raise SystemExit("pyinstrument is not installed (pip install pyinstrument)")
+            profiler = Profiler()
+            profiler.start()
+            row = fetch.scrape_url(args.retailer, args.url, args.product)
+            profiler.stop()
+            if args.output:
+                with open(args.output, 'w', encoding='utf-8') as f:
+                    f.write(profiler.output_html())
+            print(profiler.output_text(unicode=True, color=False))
+        else:
+            import cProfile
+            import pstats
+
+            profiler = cProfile.Profile()
+            row = profiler.runcall(fetch.scrape_url, args.retailer, args.url, args.product)
+            if args.output:
+                profiler.dump_stats(args.output)
+            pstats.Stats(profiler).sort_stats('cumulative').print_stats(args.limit)
+    print(json.dumps(row, ensure_ascii=False))
+    print(json.dumps(run_metrics.traces[0], indent=1))
+    if args.output:
+        print(f"Profile written to {args.output}")
+
+def cmd_report(args):
+    from .report import DEFAULT_FORMATS, report
+
+    report(HISTORY_DIR, ANALYTICS_PATH, export=not args.no_export, directory=args.output_dir,
+           formats=args.format or DEFAULT_FORMATS, force=args.force)
+
+def _day(text):
+    """argparse type for a YYYY-MM-DD day, kept as its ISO string"""
+    try:
+        return date.fromisoformat(text).isoformat()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid day {text!r}, expected YYYY-MM-DD") from None
+
+def _print_rows(rows, as_json):
+    if as_json:
+        print(json.dumps(rows, indent=1))
+    elif not rows:
+        print("No matching prices in the index")
+    else:
+        widths = {key: max(len(key), *(len(str(row[key])) for row in rows)) for key in rows[0]}
+        print('  '.join(key.ljust(width) for key, width in widths.items()))
+        for row in rows:
+            print('  '.join(str(row[key]).ljust(width) for key, width in widths.items()))
+
+def cmd_query(args):
+    from .query import PriceIndex
+
+    index = PriceIndex.load(args.index)
+    if args.query == 'latest':
+        rows = index.latest(args.product, args.retailer)
+    elif args.query == 'cheapest':
+        rows = index.cheapest(args.product, args.include_monthly)
+    elif args.query == 'series':
+        rows = index.series_for(args.product, args.retailer, args.days, args.end)
+    elif args.query == 'daily-min':
+        rows = index.daily_min(args.product, args.days, args.end, args.include_monthly)
+    else:
+        rows = index.movers(args.days, args.min_change, args.end, args.rises)
+    _print_rows(rows, args.json)
+
+def cmd_migrate(args):
+    from .store import migrate_csv_log
+
+    print(f"Migrated {migrate_csv_log(args.csv, HISTORY_DIR)} rows from {args.csv} to {HISTORY_DIR}")
+    _save_rebuilt_analytics()
+
+def cmd_renormalize(args):
+    from .store import renormalize_history
+
+    print(f"Re-normalized {renormalize_history(HISTORY_DIR)} rows in {HISTORY_DIR}")
+    _save_rebuilt_analytics()
+
+def cmd_reconvert(args):
+    from .normalize import FileRateProvider
+    from .store import reconvert_history
+
+    rates = FileRateProvider(args.rates) if args.rates else None
+    print(f"Reconverted {reconvert_history(HISTORY_DIR, rates)} rows in {HISTORY_DIR}")
+    _save_rebuilt_analytics()
+
+def cmd_rebuild_analytics(args):
+    _save_rebuilt_analytics()
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m scraper', description='Apple product price scraper')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    for name, handler, help_text in (
+        ('run', cmd_run, 'scrape, store and fold one run'),
+        ('fetch', cmd_fetch, 'scrape and print raw rows as JSON lines without storing them'),
+    ):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument('--product', action='append', help='only this product (repeatable)')
+        command.add_argument('--retailer', action='append', choices=list(RETAILER_SPECS), help='only this retailer (repeatable)')
+        command.add_argument('--stream', action='store_true', help='extract while streaming and stop downloads early')
+        command.add_argument('--parse-workers', type=int, help='extractor processes fed by the fetchers (0: parse in the fetch threads)')
+        command.add_argument('--render', action='store_true', help='render JS-dependent pages in a headless browser (needs playwright)')
+        command.add_argument('--catalog', default=CATALOG_PATH, help='catalog file (.json or .csv)')
+        command.set_defaults(handler=handler)
+    command = commands.choices['run']
+    command.add_argument('--delta', action='store_true', help='store only changed rows and record price events')
+    command.add_argument('--resume', action='store_true', help='finish the latest interrupted run instead of starting one')
+    command.add_argument('--queue', default=QUEUE_PATH)
+
+    command = commands.add_parser('enqueue', help='queue a run of the catalog for sharded workers')
+    command.add_argument('--product', action='append', help='only this product (repeatable)')
+    command.add_argument('--retailer', action='append', choices=list(RETAILER_SPECS), help='only this retailer (repeatable)')
+    command.add_argument('--catalog', default=CATALOG_PATH, help='catalog file (.json or .csv)')
+    command.add_argument('--queue', default=QUEUE_PATH)
+    command.set_defaults(handler=cmd_enqueue)
+
+    command = commands.add_parser('work', help='scrape one shard of a queued run (resumes where it stopped)')
+    command.add_argument('--shard', default='0/1', help='i/N: take the tasks of hosts i, i+N, ... of the run (N at most its number of hosts)')
+    command.add_argument('--run', help='run datetime (default: the latest unmerged run)')
+    command.add_argument('--worker', help='lease owner name (default: host and shard)')
+    command.add_argument('--batch', type=int, default=LEASE_BATCH, help='tasks leased at a time')
+    command.add_argument('--lease', type=float, default=LEASE_SECONDS, help='seconds before an unfinished lease expires')
+    command.add_argument('--stream', action='store_true', help='extract while streaming and stop downloads early')
+    command.add_argument('--parse-workers', type=int, help='extractor processes fed by the fetchers (0: parse in the fetch threads)')
+    command.add_argument('--render', action='store_true', help='render JS-dependent pages in a headless browser (needs playwright)')
+    command.add_argument('--queue', default=QUEUE_PATH)
+    command.set_defaults(handler=cmd_work)
+
+    command = commands.add_parser('merge', help='store a queued run once its shards are done')
+    command.add_argument('--run', help='run datetime (default: the latest unmerged run)')
+    command.add_argument('--absorb', action='append', help='queue file of a worker elsewhere to fold in first (repeatable)')
+    command.add_argument('--delta', action='store_true', help='store only changed rows and record price events')
+    command.add_argument('--partial', action='store_true', help='merge even if some URLs are unfinished')
+    command.add_argument('--queue', default=QUEUE_PATH)
+    command.set_defaults(handler=cmd_merge)
+
+    command = commands.add_parser('queue-status', help='task counts of a queued run')
+    command.add_argument('--run', help='run datetime (default: the latest unmerged run)')
+    command.add_argument('--shards', type=int, help='also break the counts down over this many shards')
+    command.add_argument('--queue', default=QUEUE_PATH)
+    command.set_defaults(handler=cmd_queue_status)
+
+    command = commands.add_parser('extract', help='extract price/rating from a saved page')
+    command.add_argument('retailer', choices=list(RETAILER_SPECS))
+    command.add_argument('file')
+    command.add_argument('--product', default='')
+    command.add_argument('--url', default='')
+    command.set_defaults(handler=cmd_extract)
+
+    command = commands.add_parser('profile', help='scrape one URL under a profiler and print its stage timings')
+    command.add_argument('retailer', choices=list(RETAILER_SPECS))
+    command.add_argument('url')
+    command.add_argument('--product', default='')
+    command.add_argument('--profiler', choices=['cprofile', 'pyinstrument'], default='cprofile')
+    command.add_argument('--output', help='save the profile (.prof for cProfile, .html for pyinstrument)')
+    command.add_argument('--limit', type=int, default=25, help='cProfile rows to print')
+    command.add_argument('--stream', action='store_true', help='extract while streaming')
+    command.add_argument('--use-cache', action='store_true', help='allow cached results (default: always fetch)')
+    command.set_defaults(handler=cmd_profile)
+
+    command = commands.add_parser('report', help='print and export the latest stored run')
+    command.add_argument('--no-export', action='store_true', help='print only, skip the exported files')
+    command.add_argument('--output-dir', default='.')
+    command.add_argument('--format', action='append', choices=['csv', 'parquet', 'html', 'xlsx'],
+                         help='export format (repeatable, default csv and xlsx)')
+    command.add_argument('--force', action='store_true', help='rewrite every file even if its views are unchanged')
+    command.set_defaults(handler=cmd_report)
+
+    command = commands.add_parser('query', help='answer price questions from the precomputed index')
+    queries = command.add_subparsers(dest='query', required=True)
+    query = queries.add_parser('latest', help='latest price per product x retailer')
+    query.add_argument('--product')
+    query.add_argument('--retailer')
+    query = queries.add_parser('cheapest', help='retailers of a product by latest USD price')
+    query.add_argument('product')
+    query.add_argument('--include-monthly', action='store_true', help='also list monthly plans')
+    query = queries.add_parser('series', help='daily prices of a product at a retailer')
+    query.add_argument('product')
+    query.add_argument('retailer')
+    query.add_argument('--days', type=int, default=30)
+    query.add_argument('--end', type=_day, help='last day (YYYY-MM-DD, default: the latest run\'s day)')
+    query = queries.add_parser('daily-min', help='lowest USD price of a product per day')
+    query.add_argument('product')
+    query.add_argument('--days', type=int, default=30)
+    query.add_argument('--end', type=_day, help='last day (YYYY-MM-DD, default: the latest run\'s day)')
+    query.add_argument('--include-monthly', action='store_true', help='also consider monthly plans')
+    query = queries.add_parser('movers', help='products whose price dropped (or rose) over a window')
+    query.add_argument('--days', type=int, default=7)
+    query.add_argument('--min-change', type=float, default=5.0, help='percent')
+    query.add_argument('--end', type=_day, help='last day (YYYY-MM-DD, default: the latest run\'s day)')
+    query.add_argument('--rises', action='store_true', help='price rises instead of drops')
+    for query in queries.choices.values():
+        query.add_argument('--json', action='store_true', help='print JSON instead of a table')
+        query.add_argument('--index', default=INDEX_PATH)
+    command.set_defaults(handler=cmd_query)
+
+    command = commands.add_parser('migrate', help='import the legacy CSV log into the history store')
+    command.add_argument('--csv', default=LOG_PATH)
+    command.set_defaults(handler=cmd_migrate)
+
+    command = commands.add_parser('renormalize', help='re-normalize the stored raw text of the whole history')
+    command.set_defaults(handler=cmd_renormalize)
+
+    command = commands.add_parser('reconvert', help='recompute USD prices at each run date\'s rate')
+    command.add_argument('--rates', help='CSV or JSON rate snapshot (default: the configured one)')
+    command.set_defaults(handler=cmd_reconvert)
+
+    command = commands.add_parser('rebuild-analytics', help='rebuild the running aggregates and price index from the history')
+    command.set_defaults(handler=cmd_rebuild_analytics)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.handler(args)
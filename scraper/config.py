@@ -0,0 +1,21 @@
+"""Paths and fallback exchange rates"""
+
+LOG_PATH = "data/scrape_log.csv"  # legacy log, migrated into HISTORY_DIR
+HISTORY_DIR = "data/history"
+ANALYTICS_PATH = "data/analytics.json"
+INDEX_PATH = "data/price_index.json"  # per-day price series per product x retailer, for queries
+METRICS_PATH = "data/metrics.jsonl"  # per-URL stage timings plus a summary line per run
+RUNS_PATH = "data/runs.jsonl"  # one heartbeat line per run
+EVENTS_PATH = "data/events.jsonl"  # price drop/rise events found by delta runs
+QUARANTINE_PATH = "data/quarantine.jsonl"  # rows held back by validation, with the reasons
+RATES_PATH = "data/exchange_rates.csv"  # date,currency,usd_rate snapshot (.json also accepted)
+CATALOG_PATH = "data/catalog.json"  # {product: {retailer: url}} (.csv with product,retailer,url also accepted)
+RENDER_HINTS_PATH = "data/render_hints.json"  # URLs found to need the headless-browser tier
+QUEUE_PATH = "data/queue.sqlite"  # work queue of product x retailer tasks, one set per run
+
+# Fallback exchange rates (as of November 2024), used when RATES_PATH is missing
+EXCHANGE_RATES = {
+    'AED': 0.27,  # 1 AED = 0.27 USD
+    'GBP': 1.26,  # 1 GBP = 1.26 USD
+    'USD': 1.0
+}
@@ -0,0 +1,167 @@
+"""Delta mode: persist only changed rows, log a heartbeat per run and emit price events.
+
+A run in delta mode compares every row with the latest stored row for its
+product x retailer. Only rows whose price text, rating text or status changed
+are written to the history store; the run itself is recorded as one
+heartbeat line in RUNS_PATH, and price drops/rises go to EVENTS_PATH. Prices
+are compared in the listing currency, so exchange-rate moves alone never
+count as a change. snapshot_history() rebuilds the full per-run rows from
+the deltas and heartbeats when a reader needs them.
+"""
+
+import itertools
+import json
+import os
+
+from .config import EVENTS_PATH, RUNS_PATH
+
+# A row is persisted when any of these differ from the latest stored row
+CHANGE_COLUMNS = ['original_price', 'rating_text', 'status']
+
+class LatestIndex:
+    """The latest stored values and latest known price per product x retailer, for diffing a run"""
+
+    def __init__(self, rows=None, prices=None):
+        self.rows = rows or {}
+        self.prices = prices or {}
+
+    @classmethod
+    def from_state(cls, analytics, index):
+        """Build the index from the folded state instead of the history store.
+
+        The analytics state (see AnalyticsState) holds the latest row per key
+        and the price index (see PriceIndex) the latest known price, so this
+        costs O(keys) however long the history is.
+        """
+        import pandas as pd
+
+        rows = {
+            (product, retailer): latest
+            for product, retailers in analytics.latest.items()
+            for retailer, latest in retailers.items()
+        }
+        prices = {
+            (row['product'], row['retailer']): {
+                'run_datetime': pd.Timestamp(row['last_run']), 'price': row['last_price'],
+                'price_usd': row['last_usd'], 'currency': row['currency'], 'monthly': row['monthly'],
+            }
+            for row in index.latest()
+        }
+        return cls(rows, prices)
+
+    def diff(self, typed_run):
+        """Return (changed, events): a boolean mask of rows to persist and price events"""
+        import pandas as pd
+
+        changed = []
+        events = []
+        for row in typed_run.to_dict('records'):
+            key = (str(row['product']), str(row['retailer']))
+            latest = self.rows.get(key)
+            changed.append(latest is None or any(
+                _present(row[column]) != _present(latest[column])
+                or (_present(row[column]) and row[column] != latest[column])
+                for column in CHANGE_COLUMNS
+            ))
+            previous = self.prices.get(key)
+            if previous is not None and _present(row['price']) and bool(row['monthly']) == bool(previous['monthly']) \
+                    and row['price'] != previous['price']:
+                events.append(_price_event(key, previous, row))
+        return pd.Series(changed, index=typed_run.index, dtype=bool), events
+
+
+def _present(value):
+    import pandas as pd
+
+    return not pd.isna(value)
+
+def _price_event(key, previous, row):
+    product, retailer = key
+    change = row['price'] - previous['price']
+    return {
+        'run_datetime': row['run_datetime'].strftime("%Y-%m-%d %H:%M:%S"),
+        'product': product,
+        'retailer': retailer,
+        'event': 'price_drop' if change < 0 else 'price_rise',
+        'currency': str(row['currency']),
+        'monthly': bool(row['monthly']),
+        'old_price': float(previous['price']),
+        'new_price': float(row['price']),
+        'change': round(float(change), 2),
+        'change_pct': round(float(change / previous['price'] * 100), 2),
+        'old_price_usd': None if not _present(previous['price_usd']) else float(previous['price_usd']),
+        'new_price_usd': None if not _present(row['price_usd']) else float(row['price_usd']),
+        'since': previous['run_datetime'].strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+def _append_lines(path, records):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+
+def append_events(events, path=EVENTS_PATH):
+    _append_lines(path, events)
+    return len(events)
+
+def append_run(typed_run, run_datetime, changed, delta, path=RUNS_PATH):
+    """Log the run's heartbeat: when it ran, its scope (the product x retailer keys it scraped) and how much changed"""
+    _append_lines(path, [{
+        'run_datetime': run_datetime,
+        'delta': delta,
+        'rows': len(typed_run),
+        'changed': changed,
+        'unchanged': len(typed_run) - changed,
+        'products': sorted(typed_run['product'].astype(str).unique()),
+        'retailers': sorted(typed_run['retailer'].astype(str).unique()),
+        'keys': sorted(map(list, set(zip(typed_run['product'].astype(str), typed_run['retailer'].astype(str))))),
+    }])
+
+def load_runs(path=RUNS_PATH):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+def load_events(path=EVENTS_PATH):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+def snapshot_history(history, runs):
+    """Expand delta-stored history into the full rows of every run.
+
+    Rows of full-mode runs are kept as stored; each delta run gets, for every
+    product x retailer key it scraped, the latest row stored at or before it
+    (an as-of join), stamped with the run's datetime. Heartbeats written
+    before keys were logged fall back to their products x retailers.
+    """
+    import pandas as pd
+
+    delta_runs = [run for run in runs if run.get('delta')]
+    if not delta_runs or history.empty:
+        return history
+    delta_times = pd.to_datetime([run['run_datetime'] for run in delta_runs]).astype('datetime64[s]')
+    full = history[~history['run_datetime'].isin(delta_times)]
+
+    scope = pd.DataFrame([
+        {'run': pd.Timestamp(run['run_datetime']), 'product': product, 'retailer': retailer}
+        for run in delta_runs
+        for product, retailer in run.get('keys') or itertools.product(run['products'], run['retailers'])
+    ])
+    scope['run'] = scope['run'].astype('datetime64[s]')
+    stored = history.assign(product=history['product'].astype(str), retailer=history['retailer'].astype(str))
+    expanded = pd.merge_asof(
+        scope.sort_values('run'), stored.sort_values('run_datetime'),
+        left_on='run', right_on='run_datetime', by=['product', 'retailer'], direction='backward',
+    ).dropna(subset=['run_datetime'])
+    expanded = expanded.assign(run_datetime=expanded['run']).drop(columns='run')[history.columns]
+
+    snapshot = pd.concat([full.astype({'product': str, 'retailer': str}), expanded], ignore_index=True)
+    for column in ('product', 'retailer', 'currency'):
+        snapshot[column] = snapshot[column].astype('category')
+    snapshot['status'] = snapshot['status'].astype(history['status'].dtype)
+    return snapshot.sort_values('run_datetime', kind='stable', ignore_index=True)
@@ -0,0 +1,455 @@
+"""Tiered price/rating extraction driven by the retailer specs"""
+
+import hashlib
+import json
+import re
+
+import lxml.html
+from lxml import etree
+
+from . import metrics
+from .specs import RETAILER_SPECS
+
+EXSLT_NAMESPACES = {'re': 'http://exslt.org/regular-expressions'}
+
+_JSONLD_XPATH = etree.XPath('.//script[@type="application/ld+json"]/text()')
+_META_PRICE_XPATH = etree.XPath(
+    './/meta[@property="og:price:amount" or @property="product:price:amount"'
+    ' or @itemprop="price"]/@content'
+)
+_META_CURRENCY_XPATH = etree.XPath(
+    './/meta[@property="og:price:currency" or @property="product:price:currency"'
+    ' or @itemprop="priceCurrency"]/@content'
+)
+
+_UPPER = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+def _class_condition(class_re):
+    """XPath test for a case-insensitive class regex.
+
+    Plain alternations of words ('rating|star') become native contains()
+    checks; anything else falls back to the slower EXSLT re:test().
+    """
+    words = class_re.split('|')
+    if all(re.fullmatch(r'[\w-]+', word) for word in words):
+        lowered = f"translate(@class, '{_UPPER}', '{_UPPER.lower()}')"
+        return '[' + ' or '.join(f"contains({lowered}, '{word.lower()}')" for word in words) + ']'
+    return '[re:test(@class, $class_re, "i")]'
+
+def _compile_selector(step):
+    """Compile an element step into an lxml XPath that returns the first match"""
+    attrs = step.get('attrs', {})
+    conditions = ''.join(f'[@{name}=${name.replace("-", "_")}]' for name in attrs)
+    variables = {name.replace('-', '_'): value for name, value in attrs.items()}
+    if 'class_re' in step:
+        conditions += _class_condition(step['class_re'])
+        if '$class_re' in conditions:
+            variables['class_re'] = step['class_re']
+    return etree.XPath(f'(//{step["tag"]}{conditions})[1]', namespaces=EXSLT_NAMESPACES), variables
+
+def _compile_matcher(step):
+    """Compile an element step into a predicate on single lxml elements, for streaming"""
+    attrs = step.get('attrs', {})
+    class_re = re.compile(step['class_re'], re.I) if 'class_re' in step else None
+
+    def matches(elem):
+        return (
+            elem.tag == step['tag']
+            and all(elem.get(name) == value for name, value in attrs.items())
+            and (class_re is None or bool(class_re.search(elem.get('class') or '')))
+        )
+    return matches
+
+def compile_spec(spec):
+    """Precompile every selector and pattern of a retailer spec.
+
+    Element steps become lxml XPath selectors; text steps become regexes for
+    the full-text scan, which only runs when the selectors miss.
+    """
+    compiled = dict(spec)
+    for field in ('price', 'rating'):
+        steps = spec.get(f'{field}_steps', [])
+        compiled[f'{field}_selectors'] = [_compile_selector(step) for step in steps if 'tag' in step]
+        compiled[f'{field}_matchers'] = [_compile_matcher(step) for step in steps if 'tag' in step]
+        compiled[f'{field}_scans'] = [re.compile(step['text']) for step in steps if 'text' in step]
+    # Tags any element step can match, so streaming skips the matchers for every other element
+    compiled['step_tags'] = frozenset(step['tag'] for field in ('price', 'rating')
+                                      for step in spec.get(f'{field}_steps', []) if 'tag' in step)
+    compiled['price_pattern'] = re.compile(spec['price_pattern'])
+    if spec.get('rating_pattern'):
+        compiled['rating_pattern'] = re.compile(spec['rating_pattern'])
+    return compiled
+
+def _top_level_nodes(data):
+    """Yield the top-level objects of a JSON-LD document, including the members of an @graph"""
+    for node in data if isinstance(data, list) else [data]:
+        if isinstance(node, dict):
+            yield node
+            if isinstance(node.get('@graph'), list):
+                yield from (member for member in node['@graph'] if isinstance(member, dict))
+
+def _has_type(node, name):
+    types = node.get('@type')
+    return name in types if isinstance(types, list) else types == name
+
+def _format_amount(value):
+    amount = float(str(value).replace(',', ''))
+    return str(int(amount)) if amount.is_integer() else f"{amount:.2f}"
+
+def _structured_price(amount, currency, spec):
+    """Format a structured-data price, or None if unusable for this retailer.
+
+    Offers describe the upfront price, so they are ignored for retailers whose
+    spec is monthly-only, as are prices in a currency other than the spec's.
+    """
+    if spec['monthly'] or amount in (None, '') or currency != spec['currency']:
+        return None
+    try:
+        return spec['price_format'].format(_format_amount(amount))
+    except ValueError:
+        return None
+
+def _jsonld_fields(script, spec):
+    """Return (price, rating) from the body of one JSON-LD script.
+
+    The price comes only from the offers of a top-level Product and the
+    rating only from its aggregateRating (or a top-level AggregateRating),
+    so reviews, related products and accessory lists elsewhere in the graph
+    are never mistaken for the product's own values.
+    """
+    price = rating = None
+    try:
+        data = json.loads(script)
+    except ValueError:
+        return None, None
+    for node in _top_level_nodes(data):
+        if _has_type(node, 'Product'):
+            offers = node.get('offers')
+            for offer in offers if isinstance(offers, list) else [offers]:
+                if price is None and isinstance(offer, dict):
+                    price = _structured_price(offer.get('price', offer.get('lowPrice')), offer.get('priceCurrency'), spec)
+            aggregate = node.get('aggregateRating')
+        elif _has_type(node, 'AggregateRating'):
+            aggregate = node
+        else:
+            continue
+        if rating is None and isinstance(aggregate, dict) and aggregate.get('ratingValue') not in (None, ''):
+            rating = f"{aggregate['ratingValue']} out of {aggregate.get('bestRating', 5)}"
+            if aggregate.get('reviewCount') or aggregate.get('ratingCount'):
+                rating += f" ({aggregate.get('reviewCount') or aggregate.get('ratingCount')} reviews)"
+    return price, rating
+
+def _structured_root(tree, spec):
+    """The subtree to read structured data from, per spec['structured'], or None when the tier is off"""
+    where = spec.get('structured', True)
+    if where == 'head':
+        return tree.find('head')
+    return tree if where else None
+
+def extract_structured(tree, spec):
+    """Return (price, rating) from schema.org JSON-LD or price meta tags"""
+    price = rating = None
+    tree = _structured_root(tree, spec)
+    if tree is None:
+        return None, None
+    for script in _JSONLD_XPATH(tree):
+        script_price, script_rating = _jsonld_fields(script, spec)
+        price = price or script_price
+        rating = rating or script_rating
+
+    if price is None:
+        amounts = _META_PRICE_XPATH(tree)
+        currencies = _META_CURRENCY_XPATH(tree)
+        if amounts and currencies:
+            price = _structured_price(amounts[0], currencies[0], spec)
+    return price, rating
+
+def _select(tree, selectors):
+    """Yield the text of the first element matching each compiled selector"""
+    for xpath, variables in selectors:
+        hits = xpath(tree, **variables)
+        if hits:
+            yield hits[0].text_content()
+
+def _scan_tree(tree, scans, parse_only=None):
+    """Yield the first lxml text node matching each pattern, within parse_only tags if given"""
+    for pattern in scans:
+        roots = tree.iter(*parse_only) if parse_only else [tree]
+        hit = next((text for root in roots for text in root.itertext() if pattern.search(text)), None)
+        if hit is not None:
+            yield hit
+
+def _scan_soup(soup, scans):
+    """Yield the first BeautifulSoup text node matching each pattern"""
+    for pattern in scans:
+        elem = soup.find(string=pattern)
+        if elem:
+            yield str(elem)
+
+def _match_price(texts, spec):
+    """Return the formatted price from the first text that matches price_pattern"""
+    for text in texts:
+        price_match = spec['price_pattern'].search(text)
+        if price_match:
+            price = spec['price_format'].format(price_match.group(1))
+            monthly = spec['monthly'] if spec['monthly'] is not None else '/mo' in text
+            return price + '/mo' if monthly else price
+    return None
+
+def _match_rating(texts, spec):
+    """Return the rating from the first text found, trimmed by rating_pattern"""
+    for text in texts:
+        rating = text.strip()
+        if spec.get('rating_pattern'):
+            rating_match = spec['rating_pattern'].search(rating)
+            if rating_match:
+                rating = rating_match.group(0)
+        return rating
+    return None
+
+def extract_fields(content, spec):
+    """Return (price, rating) for a page, trying the cheapest tier first.
+
+    1. schema.org JSON-LD and price meta tags
+    2. compiled lxml XPath selectors for the spec's element steps
+    3. a text scan of the lxml tree for the spec's text steps, limited to
+       spec['parse_only'] subtrees when set
+    BeautifulSoup is only used, for the text steps, when lxml cannot build a
+    tree from the page at all. Each tier is timed into the current metrics
+    trace, which also notes the tier that found the price and the rating.
+    """
+    price = rating = price_tier = rating_tier = None
+    with metrics.timed('parse'):
+        try:
+            tree = lxml.html.document_fromstring(content)
+        except (etree.ParserError, ValueError):
+            tree = None
+
+    if tree is not None:
+        with metrics.timed('extract.structured'):
+            price, rating = extract_structured(tree, spec)
+        price_tier = 'structured' if price else None
+        rating_tier = 'structured' if rating else None
+        parse_only = spec.get('parse_only')
+        tiers = (
+            ('selectors', lambda field: _select(tree, spec[f'{field}_selectors'])),
+            ('text_scan', lambda field: _scan_tree(tree, spec[f'{field}_scans'], parse_only)),
+        )
+        for tier, texts in tiers:
+            if price is not None and rating is not None:
+                break
+            with metrics.timed(f'extract.{tier}'):
+                if price is None:
+                    price = _match_price(texts('price'), spec)
+                    price_tier = tier if price else None
+                if rating is None:
+                    rating = _match_rating(texts('rating'), spec)
+                    rating_tier = tier if rating else None
+    elif spec['price_scans'] or spec['rating_scans']:
+        from bs4 import BeautifulSoup, SoupStrainer
+
+        with metrics.timed('extract.soup'):
+            strainer = SoupStrainer(spec['parse_only']) if spec.get('parse_only') else None
+            soup = BeautifulSoup(content, 'lxml', parse_only=strainer)
+            price = _match_price(_scan_soup(soup, spec['price_scans']), spec)
+            rating = _match_rating(_scan_soup(soup, spec['rating_scans']), spec)
+        price_tier = 'soup' if price else None
+        rating_tier = 'soup' if rating else None
+
+    metrics.note(price_tier=price_tier, rating_tier=rating_tier)
+    return price, rating
+
+def build_record(retailer, url, product_name, price, rating):
+    """Assemble the raw result row; fields not found stay None for normalize_frame"""
+    return {
+        'Product': product_name,
+        'Retailer': COMPILED_SPECS[retailer]['label'],
+        'Original Price': price,
+        'Rating': rating,
+        'URL': url
+    }
+
+def error_record(retailer, url, product_name, error):
+    """Build the result row for a URL that could not be fetched or parsed"""
+    return {
+        'Product': product_name,
+        'Retailer': RETAILER_SPECS[retailer]['label'],
+        'Original Price': f'Error: {str(error)[:30]}',
+        'Rating': None,
+        'URL': url
+    }
+
+def extract_record(retailer, url, product_name, content):
+    """Extract the price/rating row for one page using its retailer spec"""
+    try:
+        price, rating = extract_fields(content, COMPILED_SPECS[retailer])
+        return build_record(retailer, url, product_name, price, rating)
+    except Exception as e:
+        metrics.note(error=f'{type(e).__name__}: {e}')
+        return error_record(retailer, url, product_name, e)
+
+def parse_body(retailer, url, product_name, content):
+    """extract_record for an extractor process: return (row, trace) with the stage timings and notes"""
+    with metrics.trace(url, retailer, product_name) as record:
+        data = extract_record(retailer, url, product_name, content)
+    return data, record
+
+# Bytes handed to the streaming parser between reads of its events
+FEED_BYTES = 8 * 1024
+
+_META_PRICE_NAMES = {'og:price:amount', 'product:price:amount', 'price'}
+_META_CURRENCY_NAMES = {'og:price:currency', 'product:price:currency', 'priceCurrency'}
+
+def _best(hits):
+    """Return the value of the highest-priority (lowest rank) successful hit"""
+    ranked = [rank for rank, value in hits.items() if value is not None]
+    return hits[min(ranked)] if ranked else None
+
+def _record(hits, field, rank, value):
+    """Record a step's outcome; hits['bound'][field] tracks the best successful rank, past which steps are moot"""
+    hits[field][rank] = value
+    if value is not None and rank < hits['bound'][field]:
+        hits['bound'][field] = rank
+
+def _settled(hits):
+    """Whether the best hit so far is final: every higher-priority step has already had its one chance"""
+    ranked = [rank for rank, value in hits.items() if value is not None]
+    return bool(ranked) and all(rank in hits for rank in range(min(ranked)))
+
+def _stream_text(text, spec, hits):
+    """Record text-step hits in one finished text node"""
+    for field, match in (('price', _match_price), ('rating', _match_rating)):
+        rank = 1 + len(spec[f'{field}_matchers'])
+        for pattern in spec[f'{field}_scans']:
+            if rank >= hits['bound'][field]:
+                break
+            if rank not in hits[field] and pattern.search(text):
+                _record(hits, field, rank, match([text], spec))
+            rank += 1
+
+def _pending_step(elem, spec, hits):
+    """Whether an element step that has not had its chance yet matches elem (checked on its start tag)"""
+    return any(rank not in hits[field] and rank < hits['bound'][field] and matches(elem)
+               for field in ('price', 'rating')
+               for rank, matches in enumerate(spec[f'{field}_matchers'], 1))
+
+def _stream_element(elem, spec, hits, meta):
+    """Record any price/rating hits in a just-completed element.
+
+    Rank 0 is structured data, then the spec's element steps, then its text
+    steps. Like the tree tiers, only the first element or text node reached for
+    each step counts; a failed price match is kept as None so later nodes
+    cannot claim that step. The element's own text and its remaining
+    children's tails are scanned here, since both are complete by its end tag.
+    """
+    if not isinstance(elem.tag, str):
+        return
+    if elem.tag == 'script' and elem.get('type') == 'application/ld+json' and elem.text:
+        price, rating = _jsonld_fields(elem.text, spec)
+        if price and 0 not in hits['price']:
+            _record(hits, 'price', 0, price)
+        if rating and 0 not in hits['rating']:
+            _record(hits, 'rating', 0, rating)
+    elif elem.tag == 'meta':
+        name = elem.get('property') or elem.get('itemprop')
+        if name in _META_PRICE_NAMES:
+            meta.setdefault('amount', elem.get('content'))
+        elif name in _META_CURRENCY_NAMES:
+            meta.setdefault('currency', elem.get('content'))
+        if 'amount' in meta and 'currency' in meta and 0 not in hits['price']:
+            price = _structured_price(meta['amount'], meta['currency'], spec)
+            if price:
+                _record(hits, 'price', 0, price)
+    elif elem.tag == 'head' and spec.get('structured', True) == 'head':
+        # Structured data is only read from <head>, so that step is decided at its end tag
+        hits['price'].setdefault(0, None)
+        hits['rating'].setdefault(0, None)
+
+    if elem.tag in spec['step_tags']:
+        for field, match in (('price', _match_price), ('rating', _match_rating)):
+            for rank, matches in enumerate(spec[f'{field}_matchers'], 1):
+                if rank >= hits['bound'][field]:
+                    break
+                if rank not in hits[field] and matches(elem):
+                    _record(hits, field, rank, match([''.join(elem.itertext())], spec))
+    for text in [elem.text] + [child.tail for child in elem]:
+        if text:
+            _stream_text(text, spec, hits)
+
+def _release(elem, spec, hits):
+    """Free a processed element's subtree and its earlier siblings, scanning the siblings' tails first"""
+    elem.clear(keep_tail=True)
+    parent = elem.getparent()
+    if parent is None:
+        return
+    while parent[0] is not elem:
+        if parent[0].tail:
+            _stream_text(parent[0].tail, spec, hits)
+        del parent[0]
+
+def stream_fields(chunks, spec, max_bytes):
+    """Feed body chunks to an incremental parser until price and rating are settled.
+
+    Each element is freed once processed, unless an enclosing element may
+    still match an element step and needs its text, so memory stays bounded
+    by the open elements rather than the page. Reading stops early only when
+    no higher-priority step can change the result: structured data is decided
+    once found, at </head> for specs that keep it there, or from the start
+    when the spec turns it off. Returns (price, rating,
+    size, body_hash): the bytes read and the SHA-256 of the body, which is
+    None if reading stopped early or hit max_bytes. The body itself is not kept.
+    """
+    parser = etree.HTMLPullParser(events=('start', 'end'))
+    # Structured prices never count for monthly-only retailers, so that step is already decided
+    structured = spec.get('structured', True)
+    hits = {
+        'price': {0: None} if spec['monthly'] or not structured else {},
+        'rating': {} if structured else {0: None},
+        'bound': {'price': float('inf'), 'rating': float('inf')},
+    }
+    meta = {}
+    # Per open element, whether it may match a pending element step (and so needs its subtree kept)
+    holding = []
+    held = 0
+    size = 0
+    digest = hashlib.sha256()
+    wants_rating = bool(spec['rating_matchers'] or spec['rating_scans'])
+
+    def process(events):
+        nonlocal held
+        for event, elem in events:
+            if event == 'start':
+                pending = elem.tag in spec['step_tags'] and _pending_step(elem, spec, hits)
+                holding.append(pending)
+                held += pending
+                continue
+            held -= holding.pop()
+            _stream_element(elem, spec, hits, meta)
+            if not held:
+                _release(elem, spec, hits)
+
+    for chunk in chunks:
+        capped = size + len(chunk) > max_bytes
+        if capped:
+            chunk = chunk[:max_bytes - size]
+        # Feed in small pieces so the parser's queue of unread events stays short, and stop within one piece
+        for start in range(0, len(chunk), FEED_BYTES):
+            piece = chunk[start:start + FEED_BYTES]
+            size += len(piece)
+            parser.feed(piece)
+            process(parser.read_events())
+            if _settled(hits['price']) and (not wants_rating or _settled(hits['rating'])):
+                return _best(hits['price']), _best(hits['rating']), size, None
+            digest.update(piece)
+        if capped:
+            return _best(hits['price']), _best(hits['rating']), size, None
+
+    try:
+        parser.close()
+    except etree.XMLSyntaxError:
+        pass
+    process(parser.read_events())
+    return _best(hits['price']), _best(hits['rating']), size, digest.hexdigest()
+
+
+COMPILED_SPECS = {retailer: compile_spec(spec) for retailer, spec in RETAILER_SPECS.items()}
@@ -0,0 +1,663 @@
+"""Polite concurrent fetching with pooled sessions and a conditional-GET cache"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from queue import SimpleQueue
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+from . import metrics, render
+from .extract import COMPILED_SPECS, build_record, error_record, extract_record, parse_body, stream_fields
+
+# Headers to mimic browser
+headers = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'Connection': 'keep-alive'
+}
+
+# Politeness budget per host: a token bucket that starts at one request per
+# min_interval seconds and adapts between fastest_interval and
+# slowest_interval. Responses faster than target_latency shrink the interval,
+# slower ones grow it, and throttling (429/503, including retried ones)
+# doubles it and pauses the host for any Retry-After. max_in_flight caps
+# simultaneous requests. Hosts not listed in HOST_BUDGETS use the defaults,
+# e.g. HOST_BUDGETS['www.apple.com'] = {'min_interval': 1.0, 'max_in_flight': 2}
+DEFAULT_MIN_INTERVAL = 2.0
+DEFAULT_FASTEST_INTERVAL = 0.5
+DEFAULT_SLOWEST_INTERVAL = 30.0
+DEFAULT_TARGET_LATENCY = 2.0
+DEFAULT_MAX_IN_FLIGHT = 1
+SPEEDUP_FACTOR = 0.75
+SLOWDOWN_FACTOR = 1.5
+HOST_BUDGETS = {}
+
+# Circuit breaker per host: after BREAKER_THRESHOLD consecutive failed URLs
+# (connection errors, timeouts, 403, 429 or 5xx left after the retries; a URL
+# counts once however many attempts it took) the host's remaining URLs are
+# skipped without a request until BREAKER_COOLDOWN seconds have passed; then
+# a single probe decides whether the breaker closes again.
+BREAKER_THRESHOLD = 3
+BREAKER_COOLDOWN = 300
+FAILURE_STATUSES = frozenset([403, 429, 500, 502, 503, 504])
+THROTTLE_STATUSES = frozenset([429, 503])
+
+# HTTP session settings: separate connect/read timeouts (seconds) and bounded
+# retries with jittered exponential backoff on throttling, 5xx and timeouts.
+# A Retry-After header is honoured up to MAX_RETRY_AFTER seconds, both
+# between retries and when pausing the host, so one hostile header cannot
+# hold the host's slot indefinitely. A status other than 200/304 left after
+# the retries becomes an error row rather than being parsed as the page.
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 15
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 1.0
+BACKOFF_JITTER = 1.0
+MAX_RETRY_AFTER = 60
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# On-disk response cache: conditional GET validators plus the record extracted
+# from each page, so unchanged pages are neither re-downloaded nor re-parsed.
+# Bump CACHE_VERSION whenever extraction logic changes to invalidate old records.
+CACHE_DIR = "data/http_cache"
+CACHE_TTL = 7 * 24 * 3600  # seconds
+CACHE_MAX_BYTES = 20 * 1024 * 1024
+CACHE_VERSION = 6
+
+# Response bodies are read in CHUNK_SIZE pieces and never beyond a retailer's
+# max_bytes (DEFAULT_MAX_BYTES unless its spec sets one). With STREAM_EXTRACT
+# on, chunks feed an incremental parser that frees each element once it is
+# processed, and the download stops once no higher-priority step can change
+# the price and rating found so far.
+CHUNK_SIZE = 64 * 1024
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+STREAM_EXTRACT = False
+
+# Pipeline mode: with PARSE_WORKERS > 0 (and STREAM_EXTRACT off), fetch lanes
+# hand downloaded bodies to that many extractor processes and move on to
+# their next URL. At most PARSE_QUEUE_PER_WORKER bodies per worker wait or
+# parse at once; beyond that, lanes block before queuing another, so
+# downloads slow to the extractors' pace instead of piling up in memory.
+PARSE_WORKERS = 0
+PARSE_QUEUE_PER_WORKER = 2
+
+class HostBudget:
+    """Adaptive request pacing, in-flight cap and circuit breaker for one host"""
+
+    def __init__(self, min_interval=None, max_in_flight=None, fastest_interval=None, slowest_interval=None,
+                 target_latency=None, failure_threshold=None, cooldown=None):
+        self.min_interval = DEFAULT_MIN_INTERVAL if min_interval is None else min_interval
+        self.max_in_flight = DEFAULT_MAX_IN_FLIGHT if max_in_flight is None else max_in_flight
+        self.fastest_interval = DEFAULT_FASTEST_INTERVAL if fastest_interval is None else fastest_interval
+        self.slowest_interval = DEFAULT_SLOWEST_INTERVAL if slowest_interval is None else slowest_interval
+        self.target_latency = DEFAULT_TARGET_LATENCY if target_latency is None else target_latency
+        self.failure_threshold = BREAKER_THRESHOLD if failure_threshold is None else failure_threshold
+        self.cooldown = BREAKER_COOLDOWN if cooldown is None else cooldown
+        # Never adapt below an explicitly configured, stricter interval
+        self.fastest_interval = min(self.fastest_interval, self.min_interval)
+        self.interval = self.min_interval
+        self._slots = threading.Semaphore(self.max_in_flight)
+        self._lock = threading.Lock()
+        self._tokens = 1.0
+        self._refilled_at = time.monotonic()
+        self._paused_until = 0.0
+        self.failures = 0
+        self._open_until = None
+        self._probing = False
+
+    def _take_token(self):
+        """Take a token if one is available; otherwise return seconds until one is"""
+        with self._lock:
+            now = time.monotonic()
+            if self.interval > 0:
+                self._tokens = min(1.0, self._tokens + (now - self._refilled_at) / self.interval)
+            else:
+                self._tokens = 1.0
+            self._refilled_at = now
+            if now < self._paused_until:
+                return self._paused_until - now
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return 0.0
+            return (1.0 - self._tokens) * self.interval
+
+    def __enter__(self):
+        with metrics.timed('budget_wait'):
+            self._slots.acquire()
+            while True:
+                wait = self._take_token()
+                if not wait:
+                    break
+                time.sleep(wait)
+        return self
+
+    def __exit__(self, *exc_info):
+        self._slots.release()
+
+    def allow(self):
+        """Whether a request may be made now, i.e. the breaker is closed or this is the probe"""
+        with self._lock:
+            if self._open_until is None:
+                return True
+            if self._probing or time.monotonic() < self._open_until:
+                return False
+            self._probing = True
+            return True
+
+    def record(self, latency=None, status=None, throttled=False, retry_after=None):
+        """Adapt pacing and the breaker to one finished request, retries included (status None: it raised).
+
+        A failed request counts as one failure however many attempts it
+        took, so a single dead URL cannot open the breaker for its host.
+        """
+        failed = status is None or status in FAILURE_STATUSES
+        with self._lock:
+            if throttled or status in THROTTLE_STATUSES:
+                self.interval = min(self.slowest_interval, max(self.interval, self.fastest_interval) * 2)
+                if retry_after:
+                    self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            elif not failed and latency is not None:
+                factor = SPEEDUP_FACTOR if latency <= self.target_latency else SLOWDOWN_FACTOR
+                self.interval = min(self.slowest_interval, max(self.fastest_interval, self.interval * factor))
+
+            self._probing = False
+            if failed:
+                self.failures += 1
+                if self.failures >= self.failure_threshold:
+                    self._open_until = time.monotonic() + self.cooldown
+            else:
+                self.failures = 0
+                self._open_until = None
+
+
+_host_budgets = {}
+_host_budgets_lock = threading.Lock()
+
+def host_budget(url):
+    """Return the shared HostBudget for the host serving url"""
+    host = urlsplit(url).hostname
+    with _host_budgets_lock:
+        if host not in _host_budgets:
+            _host_budgets[host] = HostBudget(**HOST_BUDGETS.get(host, {}))
+        return _host_budgets[host]
+
+# Connections that report how long DNS lookup plus TCP/TLS setup took
+class _TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        with metrics.timed('connect'):
+            super().connect()
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        with metrics.timed('connect'):
+            super().connect()
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools time connection setup into the current metrics trace"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TimedHTTPConnectionPool,
+            'https': _TimedHTTPSConnectionPool,
+        }
+
+
+class CappedRetry(Retry):
+    """urllib3 Retry that waits at most MAX_RETRY_AFTER seconds for a Retry-After header"""
+
+    def parse_retry_after(self, retry_after):
+        return min(super().parse_retry_after(retry_after), MAX_RETRY_AFTER)
+
+
+_host_sessions = {}
+_host_sessions_lock = threading.Lock()
+
+def host_session(url):
+    """Return the pooled keep-alive session for the host serving url"""
+    host = urlsplit(url).hostname
+    with _host_sessions_lock:
+        if host not in _host_sessions:
+            retry = CappedRetry(
+                total=MAX_RETRIES,
+                connect=MAX_RETRIES,
+                read=MAX_RETRIES,
+                status=MAX_RETRIES,
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=frozenset(['GET', 'HEAD']),
+                backoff_factor=BACKOFF_FACTOR,
+                backoff_jitter=BACKOFF_JITTER,
+                respect_retry_after_header=True,
+                raise_on_status=False,
+            )
+            pool_size = host_budget(url).max_in_flight
+            adapter = TimedHTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+            session = requests.Session()
+            session.headers.update(headers)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _host_sessions[host] = session
+        return _host_sessions[host]
+
+class ParsePool:
+    """Extractor processes fed raw bodies through a bounded queue"""
+
+    def __init__(self, workers, queue_size=None):
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        # spawn, not fork: the fetch threads may hold locks when a worker starts
+        self._pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+        self._slots = threading.BoundedSemaphore(queue_size or PARSE_QUEUE_PER_WORKER * workers)
+        self.workers = workers
+
+    def submit(self, retailer, url, product_name, content, on_parsed):
+        """Queue content (bytes) for extraction; return a Future of on_parsed(row).
+
+        Blocks while the queue is full. The extractor's stage timings and
+        notes are merged into the calling thread's URL trace. A crashed
+        extractor yields an error row rather than an exception.
+        """
+        record = metrics.current_trace()
+        with metrics.timed('parse_queue_wait'):
+            self._slots.acquire()
+        result = Future()
+
+        def done(parsed):
+            self._slots.release()
+            try:
+                data, child = parsed.result()
+                metrics.merge_trace(record, child)
+            except Exception as e:
+                if record is not None:
+                    record['error'] = f'{type(e).__name__}: {e}'
+                data = error_record(retailer, url, product_name, e)
+            try:
+                result.set_result(on_parsed(data))
+            except Exception as e:
+                result.set_exception(e)
+
+        self._pool.submit(parse_body, retailer, url, product_name, content).add_done_callback(done)
+        return result
+
+    def shutdown(self):
+        self._pool.shutdown()
+
+
+_parse_pool = None
+_parse_pool_lock = threading.Lock()
+
+def parse_pool():
+    """The shared ParsePool sized by PARSE_WORKERS, or None when pipeline mode is off"""
+    global _parse_pool
+    if PARSE_WORKERS <= 0 or STREAM_EXTRACT:
+        return None
+    with _parse_pool_lock:
+        if _parse_pool is None or _parse_pool.workers != PARSE_WORKERS:
+            if _parse_pool is not None:
+                _parse_pool.shutdown()
+            _parse_pool = ParsePool(PARSE_WORKERS)
+        return _parse_pool
+
+def reset_hosts():
+    """Forget every host's budget, breaker state and pooled session"""
+    with _host_budgets_lock:
+        _host_budgets.clear()
+    with _host_sessions_lock:
+        for session in _host_sessions.values():
+            session.close()
+        _host_sessions.clear()
+
+def _retry_after(response):
+    """Seconds asked for by a Retry-After header (delta or HTTP date, capped at MAX_RETRY_AFTER), or None"""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return CappedRetry().parse_retry_after(value)
+    except Exception:
+        return None
+
+@contextmanager
+def polite_stream(url, extra_headers=None):
+    """Open a streamed GET for url, holding the host's budget until the body is closed"""
+    session = host_session(url)
+    budget = host_budget(url)
+    with budget:
+        # Time to first byte: connection setup, request, server think time and any retries
+        started = time.perf_counter()
+        try:
+            with metrics.timed('ttfb'):
+                response = session.get(url, headers=extra_headers, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), stream=True)
+        except Exception:
+            budget.record()
+            raise
+        history = response.raw.retries.history if response.raw.retries else ()
+        budget.record(
+            latency=time.perf_counter() - started,
+            status=response.status_code,
+            throttled=any(attempt.status in THROTTLE_STATUSES for attempt in history),
+            retry_after=_retry_after(response),
+        )
+        metrics.note(http_status=response.status_code, retries=len(history), interval=round(budget.interval, 3))
+        try:
+            yield response
+        finally:
+            response.close()
+
+def read_capped(response, max_bytes):
+    """Read a streamed body up to max_bytes; return (body, complete)"""
+    body = bytearray()
+    for chunk in response.iter_content(CHUNK_SIZE):
+        if len(body) + len(chunk) > max_bytes:
+            body += chunk[:max_bytes - len(body)]
+            return bytes(body), False
+        body += chunk
+    return bytes(body), True
+
+class ResponseCache:
+    """URL-keyed cache of validators, body hashes and extracted records"""
+
+    def __init__(self, directory=CACHE_DIR, ttl=CACHE_TTL, max_bytes=CACHE_MAX_BYTES):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+    def _path(self, url):
+        return os.path.join(self.directory, hashlib.sha256(url.encode()).hexdigest() + '.json')
+
+    def lookup(self, url):
+        """Return the live cache entry for url, or None if missing or expired"""
+        try:
+            with open(self._path(url), encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get('version') != CACHE_VERSION or entry.get('url') != url:
+            return None
+        if time.time() - entry.get('stored_at', 0) > self.ttl:
+            return None
+        return entry
+
+    @staticmethod
+    def conditional_headers(entry):
+        """Build If-None-Match/If-Modified-Since headers from a cache entry"""
+        if not entry:
+            return {}
+        conditional = {}
+        if entry.get('etag'):
+            conditional['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            conditional['If-Modified-Since'] = entry['last_modified']
+        return conditional
+
+    def store(self, url, response, body_hash, record):
+        os.makedirs(self.directory, exist_ok=True)
+        entry = {
+            'version': CACHE_VERSION,
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'body_sha256': body_hash,
+            'record': record,
+            'stored_at': time.time(),
+        }
+        self._write(url, entry)
+
+    def _write(self, url, entry):
+        # Written aside and renamed, so an interrupted write never leaves a truncated entry
+        tmp_path = self._path(url) + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, self._path(url))
+
+    def forget(self, url):
+        """Drop url's entry so its next fetch is unconditional and re-extracted"""
+        try:
+            os.remove(self._path(url))
+        except FileNotFoundError:
+            pass
+
+    def refresh(self, url, entry, response):
+        """Restart the TTL of an entry that was confirmed unchanged"""
+        if response.headers.get('ETag'):
+            entry['etag'] = response.headers['ETag']
+        if response.headers.get('Last-Modified'):
+            entry['last_modified'] = response.headers['Last-Modified']
+        entry['stored_at'] = time.time()
+        self._write(url, entry)
+
+    def prune(self):
+        """Drop expired entries, then the oldest ones until under max_bytes"""
+        if not os.path.isdir(self.directory):
+            return
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            stat = os.stat(path)
+            if time.time() - stat.st_mtime > self.ttl:
+                os.remove(path)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+
+response_cache = ResponseCache()
+
+def scrape_url(retailer, url, product_name, pool=None):
+    """Fetch one URL with a conditional GET and extract it unless unchanged.
+
+    With a ParsePool the body is extracted by the pool's processes and a
+    Future of the row is returned as soon as it is queued.
+    """
+    with metrics.trace(url, retailer, product_name) as record:
+        data = _scrape_url(retailer, url, product_name, pool)
+        if not isinstance(data, Future):
+            _note_found(record, data)
+        return data
+
+def _note_found(record, data):
+    if record is not None:
+        record.update(price_found=data['Original Price'] is not None and not data['Original Price'].startswith(('Error', 'Skipped')),
+                      rating_found=data['Rating'] is not None)
+    return data
+
+def skipped_record(retailer, url, product_name):
+    """Build the result row for a URL skipped because its host's circuit breaker is open"""
+    return {
+        'Product': product_name,
+        'Retailer': COMPILED_SPECS[retailer]['label'],
+        'Original Price': f'Skipped: {urlsplit(url).hostname} circuit open',
+        'Rating': None,
+        'URL': url
+    }
+
+def _scrape_url(retailer, url, product_name, pool=None):
+    if not host_budget(url).allow():
+        print(f"  Skipping {retailer} for {product_name}: too many failures, circuit open")
+        metrics.note(cache='skipped')
+        return skipped_record(retailer, url, product_name)
+
+    if render.wants_render(retailer, url):
+        data = _rendered(retailer, url, product_name)
+        if data is not None:
+            return data
+
+    spec = COMPILED_SPECS[retailer]
+    max_bytes = spec.get('max_bytes', DEFAULT_MAX_BYTES)
+    entry = response_cache.lookup(url)
+    try:
+        with polite_stream(url, response_cache.conditional_headers(entry)) as response:
+            if entry and response.status_code == 304:
+                print(f"  {retailer} for {product_name} not modified, reusing cached result")
+                metrics.note(cache='not_modified')
+                response_cache.refresh(url, entry, response)
+                return dict(entry['record'])
+            if response.status_code != 200:
+                # Retries are used up: the body is an error page, not the product page
+                metrics.note(error=f'HTTP {response.status_code}')
+                return error_record(retailer, url, product_name, f'HTTP {response.status_code}')
+
+            if STREAM_EXTRACT:
+                print(f"  Streaming {retailer} for {product_name}...")
+                with metrics.timed('stream_extract'):
+                    price, rating, size, body_hash = stream_fields(
+                        response.iter_content(CHUNK_SIZE), spec, max_bytes)
+                data = build_record(retailer, url, product_name, price, rating)
+            else:
+                with metrics.timed('download'):
+                    body, complete = read_capped(response, max_bytes)
+                size, body_hash = len(body), hashlib.sha256(body).hexdigest() if complete else None
+            metrics.note(bytes=size, complete=body_hash is not None)
+    except Exception as e:
+        metrics.note(error=f'{type(e).__name__}: {e}')
+        return error_record(retailer, url, product_name, e)
+
+    if not STREAM_EXTRACT:
+        if entry and body_hash and entry['body_sha256'] == body_hash:
+            print(f"  {retailer} for {product_name} unchanged, reusing cached result")
+            metrics.note(cache='unchanged')
+            response_cache.refresh(url, entry, response)
+            return dict(entry['record'])
+
+    metrics.note(cache='miss')
+
+    def store(data):
+        if not (data['Original Price'] or '').startswith('Error'):
+            response_cache.store(url, response, body_hash, data)
+        return data
+
+    if STREAM_EXTRACT:
+        return store(_render_missing(retailer, url, product_name, data))
+    print(f"  Scraping {retailer} for {product_name}...")
+    if pool is not None:
+        # Extracted off-thread, so a missing price is not retried in the browser here
+        record = metrics.current_trace()
+        return pool.submit(retailer, url, product_name, body,
+                           lambda data: _note_found(record, store(_noted_static(retailer, url, data))))
+    data = extract_record(retailer, url, product_name, body)
+    return store(_render_missing(retailer, url, product_name, data))
+
+def _rendered(retailer, url, product_name):
+    """Render url in the browser tier within the host's politeness budget; None if the tier is unavailable.
+
+    The render's outcome is recorded on the budget like a request's, so it
+    paces the host, counts toward its breaker and settles a half-open probe.
+    """
+    metrics.note(cache='rendered')
+    budget = host_budget(url)
+    try:
+        with budget:
+            started = time.perf_counter()
+            try:
+                data = render.render_record(retailer, url, product_name, headers['User-Agent'])
+            except Exception:
+                budget.record()
+                raise
+            # Unavailable: nothing was requested, and the requests path that follows records its own outcome
+            if data is not None:
+                failed = (data['Original Price'] or '').startswith('Error')
+                budget.record(latency=time.perf_counter() - started, status=None if failed else 200)
+            return data
+    except Exception as e:
+        metrics.note(error=f'{type(e).__name__}: {e}')
+        return error_record(retailer, url, product_name, e)
+
+def _noted_static(retailer, url, data):
+    """Pass a static-path row on, settling the render recheck of its URL if it has a hint"""
+    if not (data['Original Price'] or '').startswith('Error'):
+        render.note_static(retailer, url, data['Original Price'])
+    return data
+
+def _render_missing(retailer, url, product_name, data):
+    """Retry a page whose static HTML had no price in the browser tier, when it is enabled"""
+    _noted_static(retailer, url, data)
+    if not render.RENDER_ENABLED or data['Original Price'] is not None:
+        return data
+    rendered = _rendered(retailer, url, product_name)
+    if rendered is None or rendered['Original Price'] is None or rendered['Original Price'].startswith('Error'):
+        return data
+    return rendered
+
+def scrape_all(catalog, on_result=None):
+    """Scrape every product/retailer URL, running different hosts in parallel.
+
+    Each host gets as many worker lanes as its max in-flight budget, so a slow
+    or throttled retailer never ties up workers meant for the others. In
+    pipeline mode (PARSE_WORKERS) the lanes only fetch and the bodies are
+    extracted by the parse pool. Results come back in catalog order;
+    on_result(product, retailer, row), if given, is also called as each URL
+    finishes.
+    """
+    tasks = [
+        (product_name, retailer, url)
+        for product_name, retailers in catalog.items()
+        for retailer, url in retailers.items()
+    ]
+    results = [None] * len(tasks)
+    finished = SimpleQueue()
+    pool = parse_pool()
+
+    queues = {}
+    for index, (_, _, url) in enumerate(tasks):
+        queues.setdefault(urlsplit(url).hostname, []).append(index)
+
+    def run_lane(queue, lock):
+        while True:
+            with lock:
+                if not queue:
+                    return
+                index = queue.pop(0)
+            product_name, retailer, url = tasks[index]
+            try:
+                finished.put((index, scrape_url(retailer, url, product_name, pool)))
+            except BaseException as e:
+                finished.put((index, e))
+                raise
+
+    lanes = []
+    for host, queue in queues.items():
+        lock = threading.Lock()
+        budget = host_budget(tasks[queue[0]][2])
+        lanes.extend([(queue, lock)] * min(budget.max_in_flight, len(queue)))
+
+    if not lanes:
+        return []
+    with ThreadPoolExecutor(max_workers=len(lanes)) as executor:
+        lane_futures = [executor.submit(run_lane, queue, lock) for queue, lock in lanes]
+        # Rows are collected here, so on_result always runs on the calling thread
+        for _ in tasks:
+            index, data = finished.get()
+            if isinstance(data, BaseException):
+                raise data
+            results[index] = data.result() if isinstance(data, Future) else data
+            if on_result is not None:
+                on_result(*tasks[index][:2], results[index])
+        for future in lane_futures:
+            future.result()
+
+    response_cache.prune()
+    return results
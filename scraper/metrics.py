@@ -0,0 +1,156 @@
+"""Per-URL and per-stage run metrics, written as JSON lines next to the log.
+
+Stages time themselves with timed(stage) and attach facts with note(); both
+land on the trace of the URL being scraped by the current thread, or on the
+run itself when no URL trace is open. Nothing is collected unless a
+RunMetrics is active, so stages run by other commands pay only for a
+perf_counter() call.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from .config import METRICS_PATH
+
+# Histogram bucket upper bounds in milliseconds
+BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000]
+
+_local = threading.local()
+active = None
+
+class RunMetrics:
+    """Collects URL traces and run-level stage timings for one run"""
+
+    def __init__(self):
+        self.traces = []
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        global active
+        active = self
+        return self
+
+    def __exit__(self, *exc_info):
+        global active
+        active = None
+
+    def summary(self):
+        """Histogram summary of every stage, overall and per retailer"""
+        samples = {}
+        for trace in self.traces:
+            for stage, seconds in trace['timings'].items():
+                samples.setdefault(('all', stage), []).append(seconds)
+                samples.setdefault((trace['retailer'], stage), []).append(seconds)
+        summary = {}
+        for (retailer, stage), values in sorted(samples.items()):
+            summary.setdefault(retailer, {})[stage] = histogram(values)
+        for retailer in list(summary):
+            traces = [trace for trace in self.traces if retailer in ('all', trace['retailer'])]
+            summary[retailer]['bytes'] = sum(trace.get('bytes', 0) for trace in traces)
+            summary[retailer]['urls'] = len(traces)
+        return summary
+
+    def write(self, run_datetime, path=METRICS_PATH, shard=None):
+        """Append one line per URL plus a summary line; return the path.
+
+        A sharded worker passes its shard ('i/N'): its lines carry it and its
+        summary is a 'shard' line, so the single 'run' line of a run is the
+        one written where it is stored (by run or merge).
+        """
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        scope = {'shard': shard} if shard else {}
+        with open(path, 'a', encoding='utf-8') as f:
+            for trace in self.traces:
+                timings = {stage: round(seconds, 6) for stage, seconds in trace['timings'].items()}
+                f.write(json.dumps({'type': 'url', 'run_datetime': run_datetime, **scope, **trace,
+                                    'timings': timings}) + '\n')
+            f.write(json.dumps({
+                'type': 'shard' if shard else 'run',
+                'run_datetime': run_datetime,
+                **scope,
+                'stages': {stage: round(seconds, 6) for stage, seconds in self.stages.items()},
+                # Run-level stages (normalize, store, ...) are vectorized over the run;
+                # this is their cost spread over its URLs
+                'stages_per_url': {stage: round(seconds / max(len(self.traces), 1), 6)
+                                   for stage, seconds in self.stages.items()},
+                'summary': self.summary(),
+            }) + '\n')
+        return path
+
+
+def histogram(values):
+    """Count, total, percentiles and bucket counts for a list of durations in seconds"""
+    ordered = sorted(values)
+
+    def percentile(fraction):
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000, 3)
+
+    buckets = {}
+    for seconds in ordered:
+        bound = next((bound for bound in BUCKETS_MS if seconds * 1000 <= bound), None)
+        label = f'<={bound}ms' if bound is not None else f'>{BUCKETS_MS[-1]}ms'
+        buckets[label] = buckets.get(label, 0) + 1
+    return {
+        'count': len(ordered),
+        'total_s': round(sum(ordered), 6),
+        'p50_ms': percentile(0.5),
+        'p90_ms': percentile(0.9),
+        'max_ms': round(ordered[-1] * 1000, 3),
+        'buckets': buckets,
+    }
+
+@contextmanager
+def trace(url, retailer, product):
+    """Open the metrics trace for one URL on the current thread"""
+    record = {'url': url, 'retailer': retailer, 'product': product, 'timings': {}}
+    _local.trace = record
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        _local.trace = None
+        record['timings']['total'] = time.perf_counter() - start
+        run = active
+        if run is not None:
+            with run._lock:
+                run.traces.append(record)
+
+def current_trace():
+    """The URL trace open on the current thread, or None"""
+    return getattr(_local, 'trace', None)
+
+def merge_trace(record, child):
+    """Fold a trace recorded elsewhere (e.g. in an extractor process) into record"""
+    if record is None:
+        return
+    for stage, seconds in child['timings'].items():
+        if stage != 'total':
+            record['timings'][stage] = record['timings'].get(stage, 0.0) + seconds
+    record.update({key: value for key, value in child.items() if key not in ('url', 'retailer', 'product', 'timings')})
+
+def add_time(stage, seconds):
+    record = getattr(_local, 'trace', None)
+    if record is not None:
+        record['timings'][stage] = record['timings'].get(stage, 0.0) + seconds
+    elif active is not None:
+        with active._lock:
+            active.stages[stage] = active.stages.get(stage, 0.0) + seconds
+
+@contextmanager
+def timed(stage):
+    """Add the time spent in the block to stage"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_time(stage, time.perf_counter() - start)
+
+def note(**fields):
+    """Attach facts (status, bytes, cache outcome, ...) to the current URL trace"""
+    record = getattr(_local, 'trace', None)
+    if record is not None:
+        record.update(fields)
@@ -0,0 +1,198 @@
+"""Typed normalization of scraped rows and date-indexed USD exchange rates"""
+
+import bisect
+import csv
+import functools
+import json
+import os
+import re
+from datetime import date
+
+from .config import EXCHANGE_RATES, RATES_PATH
+from .specs import RETAILER_SPECS
+
+# Outcome of normalizing each row, stored as a typed column instead of
+# sentinel strings in the price/rating fields
+PRICE_STATUSES = ['ok', 'not_found', 'unparseable', 'unknown_currency', 'error', 'skipped', 'quarantined']
+
+RATE_CACHE_SIZE = 4096
+
+class RateProvider:
+    """Source of USD exchange rates by currency and date.
+
+    Subclasses implement _lookup(currency, day); rate() memoizes it in an
+    in-memory LRU, and usd_rates() resolves whole columns with one lookup
+    per distinct (currency, day) pair.
+    """
+
+    def __init__(self):
+        self.rate = functools.lru_cache(maxsize=RATE_CACHE_SIZE)(self._lookup)
+
+    def _lookup(self, currency, day):
+        raise NotImplementedError
+
+    def usd_rates(self, currencies, datetimes):
+        """Return a float Series of USD rates aligned with the given columns"""
+        import pandas as pd
+
+        keys = pd.DataFrame({
+            'currency': currencies.astype(object),
+            'day': pd.to_datetime(datetimes).dt.date,
+        }, index=currencies.index)
+        pairs = keys.dropna().drop_duplicates()
+        lookup = {
+            (currency, day): self.rate(currency, day)
+            for currency, day in zip(pairs['currency'], pairs['day'])
+        }
+        return pd.Series(
+            [lookup.get(key) for key in zip(keys['currency'], keys['day'])],
+            index=keys.index, dtype=float,
+        )
+
+
+class StaticRateProvider(RateProvider):
+    """The same rates for every date"""
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = dict(rates)
+
+    def _lookup(self, currency, day):
+        return self.rates.get(currency)
+
+
+class FileRateProvider(RateProvider):
+    """Date-indexed rates loaded from a local CSV or JSON snapshot.
+
+    CSV files have date,currency,usd_rate rows; JSON files map
+    'YYYY-MM-DD' to {currency: usd_rate}. A lookup returns the latest rate on
+    or before the requested day, or the earliest known rate for days before
+    the table starts. USD is always 1.0.
+    """
+
+    def __init__(self, path=RATES_PATH):
+        super().__init__()
+        self.path = path
+        self.table = {}
+        with open(path, encoding='utf-8', newline='') as f:
+            if path.endswith('.json'):
+                entries = [(day, currency, rate) for day, rates in json.load(f).items() for currency, rate in rates.items()]
+            else:
+                entries = [(row['date'], row['currency'], row['usd_rate']) for row in csv.DictReader(f)]
+        for day, currency, rate in entries:
+            self.table.setdefault(currency, []).append((date.fromisoformat(day), float(rate)))
+        for rates in self.table.values():
+            rates.sort()
+        self._days = {currency: [day for day, _ in rates] for currency, rates in self.table.items()}
+
+    def _lookup(self, currency, day):
+        if currency == 'USD':
+            return 1.0
+        rates = self.table.get(currency)
+        if not rates:
+            return None
+        index = bisect.bisect_right(self._days[currency], day)
+        return rates[max(index - 1, 0)][1]
+
+
+@functools.lru_cache(maxsize=None)
+def default_rate_provider():
+    """The RATES_PATH snapshot if present, otherwise the static EXCHANGE_RATES.
+
+    Loaded on first use and shared afterwards.
+    """
+    if os.path.exists(RATES_PATH):
+        return FileRateProvider(RATES_PATH)
+    return StaticRateProvider(EXCHANGE_RATES)
+
+CURRENCY_BY_LABEL = {spec['label']: spec['currency'] for spec in RETAILER_SPECS.values()}
+# Currency codes and symbols recognized in price text; the first one in the text wins
+CURRENCY_BY_SYMBOL = {'AED': 'AED', 'GBP': 'GBP', 'USD': 'USD', 'EUR': 'EUR', '£': 'GBP', '$': 'USD', '€': 'EUR'}
+_CURRENCY_RE = '(' + '|'.join(re.escape(symbol) for symbol in CURRENCY_BY_SYMBOL) + ')'
+
+# Placeholder texts written by older runs when nothing was extracted
+_NOT_FOUND_RE = r'^(?:Check website|See website|Not displayed|No rating(?: displayed)?)$'
+
+def _first_number(text, pattern):
+    import pandas as pd
+
+    return pd.to_numeric(text.str.extract(pattern)[0].str.replace(',', '', regex=False), errors='coerce')
+
+def _split_ratings(rating_text):
+    """Split free-text ratings into numeric rating and review count columns.
+
+    Handles '4.2 out of 5', '4.6 out of 5 (210 reviews)', '4.7 (12K reviews)',
+    '4.5/5', bare ratings ('4.4'), Sharaf DG's run-together rating and count
+    ('4.21301  Reviews' is 4.2 from 1301 reviews) and bare counts above 5
+    (Argos shows '127', a review count).
+    """
+    import pandas as pd
+
+    text = rating_text.str.strip().str.replace(r'\s+', ' ', regex=True)
+
+    rating = _first_number(text, r'^(\d+(?:\.\d+)?)\s*(?:out of\s*5|/\s*5|\()')
+    reviews = _first_number(text, r'\((\d[\d,.]*)\s*[KM]?\s*reviews?\)')
+    scale = text.str.extract(r'\(\d[\d,.]*\s*([KM]?)\s*reviews?\)', flags=re.I)[0].map({'K': 1e3, 'M': 1e6}).fillna(1)
+    reviews = (reviews * scale).round()
+
+    joined = text.str.extract(r'^([0-5](?:\.\d)?)(\d+) Reviews?$', flags=re.I)
+    rating = rating.fillna(pd.to_numeric(joined[0], errors='coerce'))
+    reviews = reviews.fillna(pd.to_numeric(joined[1], errors='coerce'))
+
+    bare = _first_number(text, r'^(\d+(?:\.\d+)?)$')
+    rating = rating.fillna(bare.where(bare <= 5))
+    reviews = reviews.fillna(bare.where((bare > 5) & (bare == bare.round())))
+
+    return rating.where(rating <= 5), reviews.astype('Int64')
+
+def normalize_frame(df, rates=None):
+    """Normalize scraped rows (the scrape_log.csv columns) into typed history columns.
+
+    Runs vectorized over the whole frame, so one run and the full history cost
+    the same single pass: numeric amount extraction, currency detection and
+    USD conversion at each row's run-date rate (from the given RateProvider,
+    default default_rate_provider()), monthly vs upfront classification,
+    rating/review-count splitting and a per-row status. The currency is the
+    one the price text shows, falling back to the retailer's own only when
+    the text has no symbol or code, so validation sees a page that switched
+    currency.
+    """
+    import pandas as pd
+
+    rates = default_rate_provider() if rates is None else rates
+    original = df['Original Price'].astype('string')
+    run_datetime = pd.to_datetime(df['Run Datetime']).astype('datetime64[s]')
+    failed = original.str.startswith('Error').fillna(False)
+    skipped = original.str.startswith('Skipped').fillna(False)
+    missing = original.isna() | original.str.strip().str.match(_NOT_FOUND_RE).fillna(False)
+    amount = _first_number(original, r'(\d[\d,]*(?:\.\d+)?)').where(~failed & ~skipped & ~missing)
+
+    currency = original.str.extract(_CURRENCY_RE)[0].astype(object).map(CURRENCY_BY_SYMBOL)
+    currency = currency.fillna(df['Retailer'].map(CURRENCY_BY_LABEL))
+    price_usd = amount * rates.usd_rates(currency, run_datetime)
+
+    status = pd.Series('ok', index=df.index)
+    status = status.mask(price_usd.isna() & amount.notna(), 'unknown_currency')
+    status = status.mask(amount.isna(), 'unparseable')
+    status = status.mask(missing, 'not_found')
+    status = status.mask(failed, 'error')
+    status = status.mask(skipped, 'skipped')
+
+    rating_text = df['Rating'].astype('string')
+    rating, review_count = _split_ratings(rating_text)
+
+    return pd.DataFrame({
+        'run_datetime': run_datetime,
+        'product': df['Product'].astype('category'),
+        'retailer': df['Retailer'].astype('category'),
+        'url': df['URL'].astype('string'),
+        'original_price': original,
+        'price': amount,
+        'currency': currency.astype('category'),
+        'monthly': original.str.contains('/mo', regex=False).fillna(False).astype(bool),
+        'price_usd': price_usd.round(2),
+        'rating_text': rating_text,
+        'rating': rating,
+        'review_count': review_count,
+        'status': pd.Categorical(status, categories=PRICE_STATUSES),
+    })
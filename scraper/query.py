@@ -0,0 +1,155 @@
+"""Price history queries answered from a precomputed per-day index.
+
+PriceIndex keeps, for every product x retailer, a day-ordered series of
+that day's min/max/last USD price and last listed price. It is folded one run
+at a time like AnalyticsState, so the latest price per key is the last
+series entry, a date window is a bisect into the series' day keys (kept
+alongside it), and per-day minimums are one pass over a product's series. No query reads the history store.
+"""
+
+import bisect
+import json
+import os
+from datetime import date, timedelta
+
+from .config import HISTORY_DIR, INDEX_PATH, RUNS_PATH
+from .delta import load_runs, snapshot_history
+from .specs import RETAILER_SPECS
+from .store import read_history
+
+# Fields of one series entry, stored as a list to keep the index compact
+SERIES_FIELDS = ['day', 'min_usd', 'max_usd', 'last_usd', 'last_price', 'currency', 'monthly', 'last_run']
+
+def _entry(values):
+    return dict(zip(SERIES_FIELDS, values))
+
+def retailer_label(retailer):
+    """Stored retailer label for a RETAILER_SPECS key ('Argos' -> 'Argos (UK)'); labels pass through"""
+    return RETAILER_SPECS[retailer]['label'] if retailer in RETAILER_SPECS else retailer
+
+class PriceIndex:
+    """Per-day price series per product x retailer, folded in one run at a time"""
+
+    def __init__(self, series=None, last_run=None):
+        self.series = series or {}
+        self.last_run = last_run
+        # Day keys of every series, in step with it, so windows bisect without rebuilding them
+        self.days = {(product, retailer): [entry[0] for entry in entries]
+                     for product, retailers in self.series.items() for retailer, entries in retailers.items()}
+
+    @classmethod
+    def load(cls, path=INDEX_PATH):
+        try:
+            with open(path, encoding='utf-8') as f:
+                return cls(**json.load(f))
+        except FileNotFoundError:
+            return cls()
+
+    def save(self, path=INDEX_PATH):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'series': self.series, 'last_run': self.last_run}, f)
+        os.replace(tmp_path, path)
+
+    def fold(self, rows):
+        """Fold typed history rows (see normalize_frame) newer than last_run into the index"""
+        import pandas as pd
+
+        if self.last_run is not None:
+            rows = rows[rows['run_datetime'] > pd.Timestamp(self.last_run)]
+        for row in rows.sort_values('run_datetime', kind='stable').itertuples(index=False):
+            run_datetime = row.run_datetime.strftime("%Y-%m-%d %H:%M:%S")
+            self.last_run = max(self.last_run or run_datetime, run_datetime)
+            if pd.isna(row.price) or pd.isna(row.price_usd):
+                continue
+            price_usd = float(row.price_usd)
+            series = self.series.setdefault(str(row.product), {}).setdefault(str(row.retailer), [])
+            days = self.days.setdefault((str(row.product), str(row.retailer)), [])
+            day = run_datetime[:10]
+            if series and series[-1][0] == day:
+                entry = series[-1]
+                entry[1:] = [min(entry[1], price_usd), max(entry[2], price_usd), price_usd,
+                             float(row.price), str(row.currency), bool(row.monthly), run_datetime]
+            else:
+                series.append([day, price_usd, price_usd, price_usd, float(row.price), str(row.currency),
+                               bool(row.monthly), run_datetime])
+                days.append(day)
+        return self
+
+    def _end(self, end):
+        if end is not None:
+            return str(end)
+        return self.last_run[:10] if self.last_run else date.today().isoformat()
+
+    def _window(self, product, retailer, days, end):
+        """Entries of one product x retailer label with end - days < day <= end"""
+        end = self._end(end)
+        start = (date.fromisoformat(end) - timedelta(days=days)).isoformat()
+        series = self.series.get(product, {}).get(retailer, [])
+        days_index = self.days.get((product, retailer), [])
+        return series[bisect.bisect_right(days_index, start):bisect.bisect_right(days_index, end)]
+
+    def latest(self, product=None, retailer=None):
+        """Latest known price of every product x retailer (optionally one product and/or retailer)"""
+        retailer = retailer and retailer_label(retailer)
+        return [
+            {'product': name, 'retailer': label, **_entry(series[-1])}
+            for name, retailers in self.series.items() if product in (None, name)
+            for label, series in retailers.items() if retailer in (None, label) and series
+        ]
+
+    def cheapest(self, product, include_monthly=False):
+        """Latest prices of a product, cheapest first in USD; monthly plans are left out unless asked for"""
+        prices = [row for row in self.latest(product) if include_monthly or not row['monthly']]
+        return sorted(prices, key=lambda row: row['last_usd'])
+
+    def series_for(self, product, retailer, days=30, end=None):
+        """Day-ordered entries of one product x retailer over the days up to end (default: the last run's day)"""
+        return [_entry(values) for values in self._window(product, retailer_label(retailer), days, end)]
+
+    def daily_min(self, product, days=30, end=None, include_monthly=False):
+        """Lowest USD price of a product on each day, with the retailer offering it"""
+        best = {}
+        for retailer in self.series.get(product, {}):
+            for values in self._window(product, retailer, days, end):
+                entry = _entry(values)
+                if (include_monthly or not entry['monthly']) and (
+                        entry['day'] not in best or entry['min_usd'] < best[entry['day']]['min_usd']):
+                    best[entry['day']] = {'day': entry['day'], 'retailer': retailer, 'min_usd': entry['min_usd']}
+        return [best[day] for day in sorted(best)]
+
+    def movers(self, days=7, min_change=5.0, end=None, rises=False):
+        """Products x retailers whose listed price fell (or rose) by at least min_change percent over the window.
+
+        The change compares the latest price with the last price on or
+        before the window start (or the first one inside it), in the listing
+        currency so exchange-rate moves alone do not count.
+        """
+        end = self._end(end)
+        start = (date.fromisoformat(end) - timedelta(days=days)).isoformat()
+        moved = []
+        for product, retailers in self.series.items():
+            for retailer, series in retailers.items():
+                days_index = self.days[product, retailer]
+                stop = bisect.bisect_right(days_index, end)
+                if stop == 0:
+                    continue
+                current = _entry(series[stop - 1])
+                base = bisect.bisect_right(days_index, start)
+                before = _entry(series[max(base - 1, 0)])
+                if before['day'] == current['day'] or before['monthly'] != current['monthly'] or not before['last_price']:
+                    continue
+                change_pct = (current['last_price'] - before['last_price']) / before['last_price'] * 100
+                if (change_pct >= min_change) if rises else (change_pct <= -min_change):
+                    moved.append({
+                        'product': product, 'retailer': retailer, 'change_pct': round(change_pct, 2),
+                        'from_price': before['last_price'], 'to_price': current['last_price'],
+                        'currency': current['currency'], 'from_day': before['day'], 'to_day': current['day'],
+                    })
+        return sorted(moved, key=lambda row: row['change_pct'], reverse=rises)
+
+
+def rebuild_index(root=HISTORY_DIR, runs_path=RUNS_PATH):
+    """Build the price index from scratch over the full history (delta runs expanded)"""
+    return PriceIndex().fold(snapshot_history(read_history(root), load_runs(runs_path)))
@@ -0,0 +1,220 @@
+"""Optional headless-browser tier for pages whose price only appears after JavaScript runs.
+
+Off unless RENDER_ENABLED (--render) is set, and needs playwright
+(pip install playwright && playwright install chromium). A URL is rendered
+when its retailer spec sets 'render': True, or when it is in the render hints:
+URLs whose static HTML had no price but whose rendered page did, remembered
+in RENDER_HINTS_PATH so later runs go straight to the browser. Every
+RENDER_RECHECK_DAYS a hinted URL goes through the requests path once more:
+if its static HTML now has the price the hint is dropped, otherwise it is
+rendered as before and the recheck clock restarts. Everything else stays on
+the requests path.
+
+One headless Chromium runs on a background event-loop thread with a warm
+pool of RENDER_CONTEXTS reusable contexts. Images, fonts, media and
+third-party scripts are blocked, navigation returns as soon as the response
+starts, and the page is captured as soon as the retailer's price pattern
+shows up in its text, not when it finishes loading.
+"""
+
+import asyncio
+import atexit
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+from . import metrics
+from .config import RENDER_HINTS_PATH
+from .extract import COMPILED_SPECS, build_record, error_record, extract_fields
+
+RENDER_ENABLED = False
+RENDER_CONTEXTS = 2
+RENDER_TIMEOUT = 20  # seconds for navigation, and again for the price to appear
+RENDER_RECHECK_DAYS = 7  # days before a hinted URL is tried without the browser again
+BLOCKED_RESOURCE_TYPES = frozenset(['image', 'font', 'media'])
+
+# Resolves once the price pattern matches the rendered text (patterns JS cannot compile just wait for load)
+_PRICE_VISIBLE_JS = """pattern => {
+    try { return new RegExp(pattern).test(document.body ? document.body.innerText : ''); }
+    catch (e) { return document.readyState === 'complete'; }
+}"""
+
+_SECOND_LEVEL = frozenset(['co', 'com', 'org', 'net', 'ac', 'gov'])
+
+def _site(url):
+    """Registrable part of a URL's host, e.g. 'argos.co.uk' for www.argos.co.uk"""
+    labels = (urlsplit(url).hostname or '').split('.')
+    keep = 3 if len(labels) > 2 and len(labels[-1]) == 2 and labels[-2] in _SECOND_LEVEL else 2
+    return '.'.join(labels[-keep:])
+
+class BrowserPool:
+    """A headless Chromium with a warm pool of reusable contexts, driven from one event-loop thread"""
+
+    def __init__(self, user_agent, contexts=RENDER_CONTEXTS):
+        from playwright.async_api import async_playwright
+
+        self._playwright = self._browser = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='render', daemon=True)
+        self._thread.start()
+        try:
+            self._run(self._start(async_playwright, user_agent, contexts))
+        except Exception:
+            # Launch failed part-way: stop whatever did start, and the loop thread, before reporting it
+            try:
+                self.close()
+            except Exception:
+                pass
+            raise
+
+    def _run(self, coroutine, timeout=None):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result(timeout)
+
+    async def _start(self, async_playwright, user_agent, contexts):
+        self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(headless=True)
+        self._contexts = asyncio.Queue()
+        for _ in range(contexts):
+            context = await self._browser.new_context(user_agent=user_agent)
+            await context.route('**/*', self._filter)
+            self._contexts.put_nowait(context)
+
+    @staticmethod
+    async def _filter(route):
+        request = route.request
+        if request.resource_type in BLOCKED_RESOURCE_TYPES or (
+                request.resource_type == 'script' and _site(request.url) != _site(request.frame.url)):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _render(self, url, price_pattern, timeout):
+        context = await self._contexts.get()
+        page = await context.new_page()
+        try:
+            response = await page.goto(url, wait_until='commit', timeout=timeout * 1000)
+            try:
+                await page.wait_for_function(_PRICE_VISIBLE_JS, arg=price_pattern, timeout=timeout * 1000, polling=250)
+                appeared = True
+            except Exception:
+                # No price in time: extract from whatever has rendered so far
+                appeared = False
+            return (await page.content()).encode('utf-8'), appeared, response.status if response else None
+        finally:
+            await page.close()
+            self._contexts.put_nowait(context)
+
+    def render(self, url, price_pattern, timeout=RENDER_TIMEOUT):
+        """Return (HTML bytes, whether the price pattern appeared, HTTP status) once it appears or the timeout passes"""
+        return self._run(self._render(url, price_pattern, timeout), timeout * 2 + 10)
+
+    async def _stop(self):
+        if self._browser is not None:
+            await self._browser.close()
+        if self._playwright is not None:
+            await self._playwright.stop()
+
+    def close(self):
+        try:
+            self._run(self._stop(), RENDER_TIMEOUT)
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+_pool = None
+_pool_unavailable = False
+_pool_lock = threading.Lock()
+
+def browser_pool(user_agent):
+    """The shared BrowserPool, started on first use; None if playwright is missing or the browser will not launch.
+
+    A failed start is reported once and disables the tier for the rest of
+    the process, rather than being retried for every URL.
+    """
+    global _pool, _pool_unavailable
+    with _pool_lock:
+        if _pool is None and not _pool_unavailable:
+            try:
+                _pool = BrowserPool(user_agent)
+            except ImportError:
+                _pool_unavailable = True
+                print("  Rendering tier unavailable: pip install playwright && playwright install chromium")
+            except Exception as e:
+                _pool_unavailable = True
+                print(f"  Rendering tier unavailable, the browser failed to start: {type(e).__name__}: {e}")
+            else:
+                atexit.register(_pool.close)
+        return _pool
+
+_hints = None
+_hints_lock = threading.Lock()
+
+def render_hints():
+    """{url: {'retailer', 'since'}} of URLs found to need rendering"""
+    global _hints
+    with _hints_lock:
+        if _hints is None:
+            try:
+                with open(RENDER_HINTS_PATH, encoding='utf-8') as f:
+                    _hints = json.load(f)
+            except FileNotFoundError:
+                _hints = {}
+        return _hints
+
+def _set_hint(retailer, url, needed, checked=False):
+    """Add or drop url's hint; checked restarts the recheck clock of a hint that is kept"""
+    hints = render_hints()
+    with _hints_lock:
+        if needed == (url in hints) and not (needed and checked):
+            return
+        if needed:
+            now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            hints[url] = {'retailer': retailer, 'since': hints.get(url, {}).get('since', now), 'checked': now}
+        else:
+            del hints[url]
+        os.makedirs(os.path.dirname(RENDER_HINTS_PATH) or '.', exist_ok=True)
+        tmp_path = RENDER_HINTS_PATH + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(hints, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, RENDER_HINTS_PATH)
+
+def _recheck_due(hint):
+    checked = datetime.strptime(hint.get('checked', hint['since']), "%Y-%m-%d %H:%M:%S")
+    return datetime.now() - checked >= timedelta(days=RENDER_RECHECK_DAYS)
+
+def wants_render(retailer, url):
+    """Whether url goes straight to the browser: its spec is flagged or it is a known JS-dependent page not due a recheck"""
+    if not RENDER_ENABLED:
+        return False
+    hint = render_hints().get(url)
+    return bool(COMPILED_SPECS[retailer].get('render') or (hint and not _recheck_due(hint)))
+
+def note_static(retailer, url, price):
+    """Settle the recheck of a hinted URL that went through the requests path with this static price (or None)"""
+    if RENDER_ENABLED and url in render_hints() and not COMPILED_SPECS[retailer].get('render'):
+        _set_hint(retailer, url, price is None, checked=True)
+
+def render_record(retailer, url, product_name, user_agent):
+    """Render url and extract its row, or None when the tier is unavailable.
+
+    Updates the hints: a rendered page with a price keeps (or adds) url, one
+    without drops it. Pages whose static HTML gets the price back leave the
+    tier at their next recheck (see note_static).
+    """
+    pool = browser_pool(user_agent)
+    if pool is None:
+        return None
+    spec = COMPILED_SPECS[retailer]
+    print(f"  Rendering {retailer} for {product_name}...")
+    with metrics.timed('render'):
+        body, appeared, status = pool.render(url, spec['price_pattern'].pattern)
+    metrics.note(rendered=True, render_price_appeared=appeared, bytes=len(body), http_status=status)
+    if status is not None and status >= 400:
+        # An error page, not the product page: leave the hints alone
+        return error_record(retailer, url, product_name, f'HTTP {status}')
+    price, rating = extract_fields(body, spec)
+    if not spec.get('render'):
+        _set_hint(retailer, url, price is not None)
+    return build_record(retailer, url, product_name, price, rating)
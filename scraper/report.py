@@ -0,0 +1,233 @@
+"""Console report and file exports of the latest run"""
+
+import json
+import os
+from datetime import date
+from html import escape
+
+from .config import ANALYTICS_PATH, HISTORY_DIR
+from .analytics import AnalyticsState
+from .normalize import default_rate_provider
+
+REPORT_NAME = 'apple_products_USD'
+REPORT_FORMATS = ('csv', 'parquet', 'html', 'xlsx')
+DEFAULT_FORMATS = ('csv', 'xlsx')
+# Fingerprints of the views behind each exported file, kept next to the files
+REPORT_MANIFEST = 'report_manifest.json'
+REPORT_CHUNK_ROWS = 10000
+
+def latest_run(analytics):
+    """Typed history rows of the analytics state's most recent run.
+
+    Built from the state's latest row per product x retailer, so no history
+    is read. A delta run stores only its changed rows, but every row of the
+    run was folded into the state, unchanged ones included.
+    """
+    return analytics.run_frame()
+
+def print_report(run, analytics, history=None):
+    """Print the run's rows, the comparison views built from its analytics state and the price history stats"""
+    rates = default_rate_provider()
+
+    print("\n" + "=" * 90)
+    print(f"PRICE REPORT - RUN OF {analytics.last_run}")
+    print("=" * 90)
+
+    # Display complete results
+    print("\nCOMPLETE SCRAPED DATA (All Prices in USD):")
+    print("=" * 90)
+    display_df = run[['product', 'retailer', 'original_price', 'price_usd', 'monthly', 'rating', 'review_count', 'status']]
+    print(display_df.to_string(index=False))
+
+    # Create pivot table for USD prices
+    print("\n\nPRICES IN USD BY PRODUCT AND RETAILER:")
+    print("=" * 90)
+    print(analytics.price_table().to_string())
+
+    # Create pivot table for ratings
+    print("\n\nRATINGS BY PRODUCT AND RETAILER:")
+    print("=" * 90)
+    print(analytics.rating_table().to_string())
+
+    # Price comparison analysis
+    print("\n\nPRICE COMPARISON ANALYSIS:")
+    print("=" * 90)
+    price_analysis = analytics.price_analysis()
+
+    if len(price_analysis) > 0:
+        print(price_analysis.to_string())
+
+        # Find best and worst deals
+        print("\n\nBEST DEALS (Lowest Prices):")
+        print("-" * 70)
+        for product, (retailer, price) in analytics.best_deals().items():
+            print(f"{product}: ${price:.2f} at {retailer}")
+
+    # Create summary by retailer
+    retailer_summary = analytics.retailer_summary()
+
+    # Statistics
+    print("\n\nSTATISTICS:")
+    print("=" * 90)
+    print(f"Total products scraped: {run['product'].nunique()}")
+    print(f"Total retailers checked: {run['retailer'].nunique()}")
+    print(f"Total data points collected: {len(run)}")
+
+    # Count successful scrapes
+    print(f"Successfully scraped prices: {retailer_summary['Prices Found'].sum()}/{len(run)}")
+    print(f"Successfully scraped ratings: {retailer_summary['Ratings Found'].sum()}/{len(run)}")
+
+    print("\n\nSUMMARY BY RETAILER:")
+    print("=" * 90)
+    print(retailer_summary.to_string())
+
+    if history is not None and len(history) > 0:
+        print("\n\nPRICE HISTORY (USD, ALL RUNS):")
+        print("=" * 90)
+        print(history.to_string(index=False))
+
+    print("\n\nNOTES:")
+    print("-" * 90)
+    print(f"1. Exchange rates used: 1 AED = ${rates.rate('AED', date.today())} USD, "
+          f"1 GBP = ${rates.rate('GBP', date.today())} USD (historical rows use their run date's rate)")
+    print("2. Some retailers use dynamic JavaScript loading, which may require Selenium")
+    print("3. Monthly payment prices are marked with '/mo' suffix (monthly column in the raw data)")
+    print("4. Not all retailers display customer ratings on product pages")
+    print("5. All prices have been converted to USD for easy comparison")
+    print("=" * 90)
+
+def report_views(run, analytics, history=None):
+    """The exported views as {name: (title, flat DataFrame)}"""
+    views = {
+        'raw': ('Raw Data', run),
+        'prices': ('Prices USD Comparison', analytics.price_table().reset_index()),
+        'ratings': ('Ratings Comparison', analytics.rating_table().reset_index()),
+    }
+    price_analysis = analytics.price_analysis()
+    if len(price_analysis) > 0:
+        views['analysis'] = ('Price Analysis', price_analysis.reset_index())
+    if history is not None and len(history) > 0:
+        views['history'] = ('Price History', history)
+    return views
+
+def view_fingerprint(frame):
+    """Content hash of a view: its columns, dtypes and values"""
+    import hashlib
+
+    import pandas as pd
+
+    digest = hashlib.sha256(repr([(str(column), str(dtype)) for column, dtype in frame.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(frame, index=False).values.tobytes())
+    return digest.hexdigest()
+
+def _replace(path, write):
+    """Write path through a temporary file, so a failed render never leaves it half-written"""
+    tmp = path + '.tmp'
+    write(tmp)
+    os.replace(tmp, path)
+
+def _write_csv(path, frame):
+    frame.to_csv(path, index=False, chunksize=REPORT_CHUNK_ROWS)
+
+def _write_parquet(path, frame):
+    frame.to_parquet(path, index=False)
+
+def _write_xlsx(path, views):
+    # openpyxl's write-only mode streams rows to disk instead of building every cell in memory
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    for title, frame in views.values():
+        sheet = workbook.create_sheet(title)
+        sheet.append([str(column) for column in frame.columns])
+        cells = frame.astype(object).where(frame.notna(), None)
+        for row in cells.itertuples(index=False, name=None):
+            sheet.append(row)
+    workbook.save(path)
+
+def _write_html(path, views, run_datetime):
+    sections = ''.join(
+        f'<h2>{escape(title)}</h2>\n' + frame.to_html(index=False, na_rep='', border=0, classes='view') + '\n'
+        for title, frame in views.values()
+    )
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(
+            '<!DOCTYPE html>\n<html><head><meta charset="utf-8">'
+            f'<title>Price report - run of {escape(run_datetime)}</title><style>{_HTML_STYLE}</style></head>\n'
+            f'<body><h1>Price report - run of {escape(run_datetime)}</h1>\n{sections}</body></html>\n'
+        )
+
+_HTML_STYLE = (
+    'body{font-family:sans-serif;margin:2em}table.view{border-collapse:collapse;margin-bottom:2em}'
+    'table.view th,table.view td{padding:4px 10px;border-bottom:1px solid #ddd;text-align:left}'
+    'table.view tr:hover{background:#f5f5f5}'
+)
+
+def report_outputs(views, formats):
+    """{file name: view names rendered into it} for the requested formats"""
+    outputs = {}
+    for fmt in formats:
+        if fmt in ('csv', 'parquet'):
+            outputs.update({f'{REPORT_NAME}_{name}.{fmt}': [name] for name in views})
+        else:
+            outputs[f'{REPORT_NAME}.{fmt}'] = list(views)
+    return outputs
+
+def export_report(run, analytics, directory='.', formats=DEFAULT_FORMATS, force=False, history=None):
+    """Render the report views into directory, skipping files whose views have not changed.
+
+    CSV and Parquet get one file per view, xlsx one sheet per view and html
+    one static page with every view. The fingerprints of the views behind
+    each file are kept in REPORT_MANIFEST; a file is rewritten only when
+    they changed, the format set changed the file list, or force is set.
+    Return the paths written.
+    """
+    views = report_views(run, analytics, history)
+    fingerprints = {name: view_fingerprint(frame) for name, (_, frame) in views.items()}
+    manifest_path = os.path.join(directory, REPORT_MANIFEST)
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        manifest = {}
+
+    os.makedirs(directory, exist_ok=True)
+    written = []
+    for filename, names in report_outputs(views, formats).items():
+        path = os.path.join(directory, filename)
+        inputs = {name: fingerprints[name] for name in names}
+        if not force and manifest.get(filename) == inputs and os.path.exists(path):
+            continue
+        fmt = filename.rsplit('.', 1)[1]
+        if fmt == 'xlsx':
+            _replace(path, lambda tmp: _write_xlsx(tmp, views))
+        elif fmt == 'html':
+            _replace(path, lambda tmp: _write_html(tmp, views, str(analytics.last_run)))
+        else:
+            frame = views[names[0]][1]
+            writer = _write_csv if fmt == 'csv' else _write_parquet
+            _replace(path, lambda tmp: writer(tmp, frame))
+        manifest[filename] = inputs
+        written.append(path)
+
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    unchanged = len(report_outputs(views, formats)) - len(written)
+    print(f"\nExported {len(written)} report files to {directory}" + (f" ({unchanged} unchanged)" if unchanged else ""))
+    return written
+
+def report(root=HISTORY_DIR, analytics_path=ANALYTICS_PATH, export=True, directory='.', formats=DEFAULT_FORMATS,
+           force=False):
+    """Report on the latest stored run without touching the network"""
+    state = AnalyticsState.load(analytics_path)
+    run = latest_run(state)
+    if run.empty:
+        print(f"No runs in {root} yet; run the scraper first")
+        return
+    # The comparison views cover this run only, so fold it into a fresh state;
+    # the running per-key stats of the stored state cover every run
+    analytics = AnalyticsState().fold(run)
+    history = state.history_stats()
+    print_report(run, analytics, history)
+    if export:
+        export_report(run, analytics, directory, formats, force, history)
@@ -0,0 +1,96 @@
+"""Declarative price/rating extraction specs, one per retailer"""
+
+# Extraction spec per retailer. Each *_steps list is a cascade tried in order
+# until one hits: {'text': regex} scans text nodes, {'tag': name} matches an
+# element, optionally narrowed by exact 'attrs' or a case-insensitive
+# 'class_re'. A price step counts only if price_pattern matches its text; the
+# first group is rendered with price_format and '/mo' is appended when
+# 'monthly' is True (or, when None, when the matched text contains '/mo').
+# A rating step counts as soon as it finds a node; rating_pattern, if set,
+# trims the text to the matched part. Element steps run as lxml XPath before
+# any text step; schema.org JSON-LD / price meta tags are tried before both.
+# An optional 'parse_only' list of tag names (e.g. ['head', 'main']) limits
+# the text scan to those subtrees, an optional 'max_bytes' overrides
+# fetch.DEFAULT_MAX_BYTES for the retailer's pages, and 'render': True sends
+# every page of the retailer to the headless-browser tier when it is enabled
+# (see scraper.render; without the flag only pages found to need it go there).
+# 'structured' says where structured data is read: True (the default) for
+# anywhere in the page, 'head' for <head> only, or False to skip that tier.
+# With 'head', streaming extraction knows the tier's outcome at </head> and
+# can stop reading as soon as the spec's own steps are settled.
+RETAILER_SPECS = {
+    'Apple': {
+        'label': 'Apple',
+        'currency': 'USD',
+        'monthly': False,
+        'structured': 'head',
+        'price_steps': [{'text': r'From\s*\$\d+'}],
+        'price_pattern': r'From\s*\$(\d+)',
+        'price_format': '${}',
+        'rating_steps': [],  # Apple doesn't show ratings on product pages
+    },
+    'Sharaf DG': {
+        'label': 'Sharaf DG (UAE)',
+        'currency': 'AED',
+        'monthly': False,
+        'structured': 'head',
+        'price_steps': [
+            {'tag': 'span', 'class_re': 'price'},
+            {'text': r'AED\s*[\d,]+'},
+        ],
+        'price_pattern': r'AED\s*([\d,]+)',
+        'price_format': 'AED {}',
+        'rating_steps': [{'tag': 'div', 'class_re': 'rating|star'}],
+    },
+    'Argos': {
+        'label': 'Argos (UK)',
+        'currency': 'GBP',
+        'monthly': False,
+        'structured': 'head',
+        'price_steps': [
+            {'tag': 'span', 'attrs': {'data-test': 'product-price'}},
+            {'tag': 'div', 'class_re': 'price'},
+            {'text': r'£[\d,]+\.?\d*'},
+        ],
+        'price_pattern': r'£([\d,]+\.?\d*)',
+        'price_format': '£{}',
+        'rating_steps': [
+            {'tag': 'span', 'class_re': 'rating|star'},
+            {'text': r'\d+\.?\d*\s*out of\s*5|\d+\.?\d*/5'},
+        ],
+    },
+    'Verizon': {
+        'label': 'Verizon (US)',
+        'currency': 'USD',
+        'monthly': True,
+        'structured': 'head',
+        'price_steps': [
+            {'text': r'\$[\d.]+/mo'},
+            {'tag': 'span', 'class_re': 'price'},
+        ],
+        'price_pattern': r'\$([\d.]+)/mo',
+        'price_format': '${}',
+        'rating_steps': [
+            {'text': r'\d+\.?\d*\s*out of\s*5'},
+            {'text': r'\d+\.?\d*\s*\(\d+K?\s*reviews?\)'},
+        ],
+        'rating_pattern': r'(\d+\.?\d*)\s*(?:out of 5|\([\d.KM]+\s*reviews?\))',
+    },
+    'AT&T': {
+        'label': 'AT&T (US)',
+        'currency': 'USD',
+        'monthly': None,
+        'structured': 'head',
+        'price_steps': [
+            {'text': r'\$[\d.]+/mo'},
+            {'tag': 'span', 'class_re': 'price'},
+            {'text': r'\$[\d,]+'},
+        ],
+        'price_pattern': r'\$([\d.,]+)(?:/mo)?',
+        'price_format': '${}',
+        'rating_steps': [
+            {'text': r'\d+\.?\d*\s*out of\s*5'},
+            {'tag': 'span', 'class_re': 'rating|star'},
+        ],
+    },
+}
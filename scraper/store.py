@@ -0,0 +1,138 @@
+"""Date-partitioned Parquet price history"""
+
+import functools
+import os
+
+from .config import HISTORY_DIR, LOG_PATH
+from .normalize import default_rate_provider, normalize_frame
+
+# One Parquet file per run under HISTORY_DIR/run_date=YYYY-MM-DD/, so reads
+# filtered by date only open the matching partitions and only the requested
+# columns. Raw price/rating text is kept next to the typed values.
+HISTORY_COLUMNS = [
+    'run_datetime', 'product', 'retailer', 'url', 'original_price', 'price', 'currency',
+    'monthly', 'price_usd', 'rating_text', 'rating', 'review_count', 'status',
+]
+
+@functools.lru_cache(maxsize=None)
+def history_schema():
+    """Arrow schema of the history store (built on first use, pyarrow is imported lazily)"""
+    import pyarrow as pa
+
+    return pa.schema([
+        ('run_datetime', pa.timestamp('s')),
+        ('product', pa.dictionary(pa.int32(), pa.string())),
+        ('retailer', pa.dictionary(pa.int32(), pa.string())),
+        ('url', pa.string()),
+        ('original_price', pa.string()),
+        ('price', pa.float64()),
+        ('currency', pa.dictionary(pa.int32(), pa.string())),
+        ('monthly', pa.bool_()),
+        ('price_usd', pa.float64()),
+        ('rating_text', pa.string()),
+        ('rating', pa.float64()),
+        ('review_count', pa.int64()),
+        ('status', pa.dictionary(pa.int32(), pa.string())),
+    ])
+
+def append_history(df, root=HISTORY_DIR):
+    """Normalize scraped rows and write them into the history store; return rows written"""
+    return write_history(normalize_frame(df), root)
+
+def write_history(typed, root=HISTORY_DIR):
+    """Write normalized rows into the history store, one file per run; return rows written"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    for run_datetime, run in typed.groupby('run_datetime'):
+        partition = os.path.join(root, f"run_date={run_datetime:%Y-%m-%d}")
+        os.makedirs(partition, exist_ok=True)
+        table = pa.Table.from_pandas(run, schema=history_schema(), preserve_index=False)
+        pq.write_table(table, os.path.join(partition, f"part-{run_datetime:%H%M%S}.parquet"))
+    return len(typed)
+
+def read_history(root=HISTORY_DIR, columns=None, start=None, end=None, products=None, retailers=None):
+    """Read history rows, touching only the partitions and columns asked for.
+
+    start/end are inclusive dates (date objects or 'YYYY-MM-DD' strings).
+    """
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    schema = history_schema()
+    columns = columns or HISTORY_COLUMNS
+    if not os.path.isdir(root):
+        return schema.empty_table().select(columns).to_pandas()
+
+    dataset = ds.dataset(
+        root, format='parquet',
+        partitioning=ds.partitioning(pa.schema([('run_date', pa.string())]), flavor='hive'),
+        schema=schema.append(pa.field('run_date', pa.string())),
+    )
+    condition = None
+    filters = []
+    if start is not None:
+        filters.append(ds.field('run_date') >= str(start))
+    if end is not None:
+        filters.append(ds.field('run_date') <= str(end))
+    if products:
+        filters.append(ds.field('product').isin(list(products)))
+    if retailers:
+        filters.append(ds.field('retailer').isin(list(retailers)))
+    for expression in filters:
+        condition = expression if condition is None else condition & expression
+
+    frame = dataset.to_table(columns=columns, filter=condition).to_pandas(
+        types_mapper={pa.int64(): pd.Int64Dtype()}.get)
+    if 'run_datetime' in frame:
+        frame = frame.sort_values('run_datetime', kind='stable', ignore_index=True)
+    return frame
+
+def renormalize_history(root=HISTORY_DIR):
+    """Re-run normalize_frame over the stored raw text of the whole history.
+
+    Rewrites every run file in place; no page is refetched. Rows quarantined
+    by validation keep their raw text, so they are put back as quarantined
+    (no price) rather than re-admitted. Returns rows written.
+    """
+    import pandas as pd
+
+    history = read_history(root, columns=['run_datetime', 'product', 'retailer', 'url', 'original_price',
+                                          'rating_text', 'status'])
+    raw = pd.DataFrame({
+        'Product': history['product'].astype(str),
+        'Retailer': history['retailer'].astype(str),
+        'Original Price': history['original_price'],
+        'Rating': history['rating_text'],
+        'URL': history['url'],
+        'Run Datetime': history['run_datetime'],
+    })
+    typed = normalize_frame(raw)
+    quarantined = (history['status'] == 'quarantined').to_numpy()
+    typed.loc[quarantined, ['price', 'price_usd']] = float('nan')
+    typed.loc[quarantined, 'status'] = 'quarantined'
+    return write_history(typed, root)
+
+def reconvert_history(root=HISTORY_DIR, rates=None):
+    """Recompute USD prices across the whole history at each run date's rate.
+
+    One vectorized pass over the stored amounts and currencies; nothing is
+    refetched or re-parsed. Returns rows written.
+    """
+    rates = default_rate_provider() if rates is None else rates
+    history = read_history(root)
+    converted = history['price'] * rates.usd_rates(history['currency'], history['run_datetime'])
+    history['price_usd'] = converted.round(2)
+    convertible = history['status'].isin(['ok', 'unknown_currency'])
+    history.loc[convertible, 'status'] = history.loc[convertible, 'price_usd'].notna().map(
+        {True: 'ok', False: 'unknown_currency'})
+    return write_history(history, root)
+
+def migrate_csv_log(csv_path=LOG_PATH, root=HISTORY_DIR):
+    """One-time import of the legacy CSV log into the history store"""
+    import pandas as pd
+
+    if not os.path.exists(csv_path):
+        return 0
+    return append_history(pd.read_csv(csv_path, dtype=str), root)
@@ -0,0 +1,113 @@
+"""Data-quality checks of each run against the recent history of every product x retailer.
+
+Before a run is stored, every priced row is checked against its retailer
+spec (the currency its price text shows, monthly vs upfront) and against a rolling baseline built
+from the price index: the median and spread of the listed price over the
+last BASELINE_DAYS days, with the usual currency and monthly flag. Rows that
+fail are re-fetched once, bypassing the response cache; rows still failing
+are quarantined: their raw text is kept, their numeric price is cleared and
+their status becomes 'quarantined', so no aggregate, index or price event
+uses them, and the details go to QUARANTINE_PATH for review.
+"""
+
+import json
+import os
+import statistics
+
+from .config import QUARANTINE_PATH
+from .specs import RETAILER_SPECS
+
+BASELINE_DAYS = 30
+# Days of history a key needs before its price range is checked
+MIN_BASELINE_DAYS = 3
+# A price is out of range when it is off the baseline median by more than
+# this factor and by more than MAD_LIMIT robust standard deviations
+MAX_RATIO = 2.0
+MAD_LIMIT = 5.0
+
+SPECS_BY_LABEL = {spec['label']: spec for spec in RETAILER_SPECS.values()}
+RETAILER_KEYS = {spec['label']: retailer for retailer, spec in RETAILER_SPECS.items()}
+
+def baseline(index, product, retailer, end=None, days=BASELINE_DAYS):
+    """Median, robust spread, usual currency and monthly flag of a key's recent prices, or None if too short"""
+    entries = index.series_for(product, retailer, days, end)
+    if len(entries) < MIN_BASELINE_DAYS:
+        return None
+    prices = [entry['last_price'] for entry in entries]
+    median = statistics.median(prices)
+    return {
+        'median': median,
+        'sigma': 1.4826 * statistics.median(abs(price - median) for price in prices),
+        'currency': statistics.mode(entry['currency'] for entry in entries),
+        'monthly': statistics.mode(entry['monthly'] for entry in entries),
+        'days': len(entries),
+    }
+
+def check_row(row, base):
+    """Reasons a typed row looks wrong ([] if it passes)"""
+    spec = SPECS_BY_LABEL.get(str(row['retailer']))
+    reasons = []
+    if spec is not None and str(row['currency']) != spec['currency']:
+        reasons.append('currency')
+    if spec is not None and spec['monthly'] is not None and bool(row['monthly']) != spec['monthly']:
+        reasons.append('monthly')
+    if base is not None:
+        if str(row['currency']) != base['currency'] and 'currency' not in reasons:
+            reasons.append('currency')
+        if bool(row['monthly']) != base['monthly'] and 'monthly' not in reasons:
+            reasons.append('monthly')
+        price, median = row['price'], base['median']
+        if median > 0 and not median / MAX_RATIO <= price <= median * MAX_RATIO \
+                and abs(price - median) > MAD_LIMIT * base['sigma']:
+            reasons.append('range')
+    return reasons
+
+def check_run(typed_run, index):
+    """{row label: (reasons, baseline)} for the run's priced rows that fail a check.
+
+    Rows in a currency with no exchange rate are checked too: they are
+    usually a page showing the wrong currency.
+    """
+    suspicious = {}
+    end = index.last_run[:10] if index.last_run else None
+    for label, row in typed_run[typed_run['status'].isin(['ok', 'unknown_currency'])].iterrows():
+        base = baseline(index, str(row['product']), str(row['retailer']), end)
+        reasons = check_row(row, base)
+        if reasons:
+            suspicious[label] = (reasons, base)
+    return suspicious
+
+def refetch_catalog(typed_run, labels):
+    """The catalog of just the given rows, for a targeted re-fetch"""
+    catalog = {}
+    for label in labels:
+        row = typed_run.loc[label]
+        catalog.setdefault(str(row['product']), {})[RETAILER_KEYS[str(row['retailer'])]] = str(row['url'])
+    return catalog
+
+def quarantine(typed_run, suspicious, path=QUARANTINE_PATH):
+    """Clear the prices of suspicious rows, mark them 'quarantined' and log them; return the run"""
+    if not suspicious:
+        return typed_run
+    typed_run = typed_run.copy()
+    labels = list(suspicious)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        for label in labels:
+            row = typed_run.loc[label]
+            reasons, base = suspicious[label]
+            f.write(json.dumps({
+                'run_datetime': row['run_datetime'].strftime("%Y-%m-%d %H:%M:%S"),
+                'product': str(row['product']),
+                'retailer': str(row['retailer']),
+                'url': str(row['url']),
+                'original_price': str(row['original_price']),
+                'price': float(row['price']),
+                'currency': str(row['currency']),
+                'monthly': bool(row['monthly']),
+                'reasons': reasons,
+                'baseline': base,
+            }, ensure_ascii=False) + '\n')
+    typed_run.loc[labels, ['price', 'price_usd']] = float('nan')
+    typed_run.loc[labels, 'status'] = 'quarantined'
+    return typed_run
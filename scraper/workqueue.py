@@ -0,0 +1,246 @@
+"""Persistent work queue of product x retailer tasks, so runs can be sharded and resumed.
+
+A run is enqueued once as one task per catalog URL in an SQLite file.
+Workers lease batches of their shard's tasks (`--shard i/N` keeps tasks
+whose host index is i mod N), scrape them and mark each one done with its
+result row as soon as it finishes, so an interrupted worker resumes where it
+stopped. A lease that is not completed in time expires and any worker of
+that shard can take the task again. Once every task is done, merge collects
+the rows into one run for the normal store/analytics path and the run's
+tasks are deleted. Queue files from workers on other machines are folded in
+with absorb().
+
+Shards split the catalog by retailer host, never within one: the politeness
+budget (fetch.HostBudget) is per process, so this keeps every host's rate
+and concurrency limits intact as long as each shard runs in one worker.
+Hosts are numbered in sorted order when the run is enqueued, so N shards
+get an even share of hosts (never more than one apart). N must be at most
+the run's number of hosts; parallelism beyond that comes from the lanes a
+worker runs per host (its max in-flight budget), not from more shards,
+since more workers on one host would only split the same rate limit.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from urllib.parse import urlsplit
+
+from .config import QUEUE_PATH
+
+LEASE_SECONDS = 900
+LEASE_BATCH = 25
+# Leases taken on a task before it is given up with an error row (a page that keeps killing its worker)
+MAX_ATTEMPTS = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_datetime TEXT PRIMARY KEY,
+    created TEXT NOT NULL,
+    merged TEXT
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    run_datetime TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    product TEXT NOT NULL,
+    retailer TEXT NOT NULL,
+    url TEXT NOT NULL,
+    host_index INTEGER NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    row TEXT,
+    PRIMARY KEY (run_datetime, position)
+);
+"""
+
+def parse_shard(text):
+    """'i/N' -> (i, N) with 0 <= i < N"""
+    try:
+        index, count = (int(part) for part in text.split('/'))
+    except ValueError:
+        raise ValueError(f"shard must look like i/N, got {text!r}")
+    if not 0 <= index < count:
+        raise ValueError(f"shard index must be in 0..{count - 1}, got {text!r}")
+    return index, count
+
+def host_indexes(urls):
+    """{host: index} numbering the distinct hosts of urls in sorted order"""
+    return {host: index for index, host in enumerate(sorted({urlsplit(url).hostname or '' for url in urls}))}
+
+class WorkQueue:
+    """The task table of every enqueued run, in one SQLite file shared by local workers"""
+
+    def __init__(self, path=QUEUE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        if 'key_hash' in {column for _, column, *_ in self._db.execute('PRAGMA table_info(tasks)')}:
+            # Queue files from before hosts were numbered at enqueue; their host hashes still shard by host
+            self._db.execute('ALTER TABLE tasks RENAME COLUMN key_hash TO host_index')
+        self._lock = threading.Lock()
+
+    def close(self):
+        self._db.close()
+
+    @contextmanager
+    def _write(self):
+        """One write transaction, serialized across threads and processes"""
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                yield self._db
+                self._db.execute('COMMIT')
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def enqueue(self, catalog, run_datetime=None):
+        """Add a run with one pending task per catalog URL; return its run_datetime"""
+        run_datetime = run_datetime or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        hosts = host_indexes(url for retailers in catalog.values() for url in retailers.values())
+        tasks = [
+            (run_datetime, position, product, retailer, url, hosts[urlsplit(url).hostname or ''])
+            for position, (product, retailer, url) in enumerate(
+                (product, retailer, url)
+                for product, retailers in catalog.items()
+                for retailer, url in retailers.items()
+            )
+        ]
+        with self._write() as db:
+            db.execute('INSERT INTO runs (run_datetime, created) VALUES (?, ?)',
+                       (run_datetime, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+            db.executemany('INSERT INTO tasks (run_datetime, position, product, retailer, url, host_index) '
+                           'VALUES (?, ?, ?, ?, ?, ?)', tasks)
+        return run_datetime
+
+    def open_run(self):
+        """The latest run that has not been merged yet, or None"""
+        rows = self._query('SELECT run_datetime FROM runs WHERE merged IS NULL ORDER BY run_datetime DESC LIMIT 1')
+        return rows[0][0] if rows else None
+
+    def catalog(self, run_datetime):
+        """The catalog a run was enqueued with"""
+        catalog = {}
+        for product, retailer, url in self._query(
+                'SELECT product, retailer, url FROM tasks WHERE run_datetime = ? ORDER BY position', (run_datetime,)):
+            catalog.setdefault(product, {})[retailer] = url
+        return catalog
+
+    def lease(self, run_datetime, owner, shard=(0, 1), limit=LEASE_BATCH, lease_seconds=LEASE_SECONDS):
+        """Lease up to limit pending tasks of the shard; return [(position, product, retailer, url, attempts)].
+
+        Tasks whose lease expired, or that are already leased to owner (a
+        restarted worker), are taken again.
+        """
+        index, count = shard
+        now = time.time()
+        with self._write() as db:
+            leased = db.execute(
+                'SELECT position, product, retailer, url, attempts + 1 FROM tasks '
+                'WHERE run_datetime = ? AND host_index % ? = ? '
+                "AND (state = 'pending' OR (state = 'leased' AND (lease_expires < ? OR owner = ?))) "
+                'ORDER BY position LIMIT ?',
+                (run_datetime, count, index, now, owner, limit),
+            ).fetchall()
+            db.executemany(
+                "UPDATE tasks SET state = 'leased', owner = ?, lease_expires = ?, attempts = attempts + 1 "
+                'WHERE run_datetime = ? AND position = ?',
+                [(owner, now + lease_seconds, run_datetime, position) for position, *_ in leased],
+            )
+        return leased
+
+    def complete(self, run_datetime, position, row):
+        """Mark a task done with its result row"""
+        with self._write() as db:
+            db.execute("UPDATE tasks SET state = 'done', row = ?, owner = NULL, lease_expires = NULL "
+                       'WHERE run_datetime = ? AND position = ?',
+                       (json.dumps(row, ensure_ascii=False), run_datetime, position))
+
+    def counts(self, run_datetime, shard=(0, 1)):
+        """{state: task count} of a run (or of one shard of it)"""
+        index, count = shard
+        return dict(self._query(
+            'SELECT state, COUNT(*) FROM tasks WHERE run_datetime = ? AND host_index % ? = ? GROUP BY state',
+            (run_datetime, count, index),
+        ))
+
+    def results(self, run_datetime):
+        """Result rows of the run's done tasks, in catalog order"""
+        return [json.loads(row) for (row,) in self._query(
+            "SELECT row FROM tasks WHERE run_datetime = ? AND state = 'done' ORDER BY position", (run_datetime,))]
+
+    def mark_merged(self, run_datetime):
+        """Mark a run merged and delete its tasks (their rows are in the history now)"""
+        with self._write() as db:
+            db.execute('UPDATE runs SET merged = ? WHERE run_datetime = ?',
+                       (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), run_datetime))
+            db.execute('DELETE FROM tasks WHERE run_datetime = ?', (run_datetime,))
+
+    def host_count(self, run_datetime):
+        """Number of distinct hosts in a run, the most shards it can use"""
+        return self._query('SELECT COUNT(DISTINCT host_index) FROM tasks WHERE run_datetime = ?', (run_datetime,))[0][0]
+
+    def is_merged(self, run_datetime):
+        rows = self._query('SELECT merged FROM runs WHERE run_datetime = ?', (run_datetime,))
+        if not rows:
+            raise KeyError(f"no run {run_datetime} in {self.path}")
+        return rows[0][0] is not None
+
+    def absorb(self, path):
+        """Copy the runs and done tasks of another queue file (e.g. a worker's from another machine).
+
+        Tasks of runs already merged here are left out.
+        """
+        self._query('ATTACH DATABASE ? AS other', (path,))
+        try:
+            with self._write() as db:
+                db.execute('INSERT OR IGNORE INTO runs (run_datetime, created) '
+                           'SELECT run_datetime, created FROM other.runs')
+                return db.execute(
+                    "INSERT OR REPLACE INTO tasks SELECT * FROM other.tasks WHERE state = 'done' "
+                    'AND run_datetime NOT IN (SELECT run_datetime FROM runs WHERE merged IS NOT NULL)'
+                ).rowcount
+        finally:
+            self._query('DETACH DATABASE other')
+
+
+def default_owner(shard):
+    """Lease owner of a worker: one name per shard per machine, so a restarted worker reclaims its leases"""
+    return f'{socket.gethostname()}:shard-{shard[0]}of{shard[1]}'
+
+def work(queue, run_datetime, shard=(0, 1), owner=None, batch=LEASE_BATCH, lease_seconds=LEASE_SECONDS):
+    """Scrape the shard's remaining tasks of a run, completing each as it finishes; return how many ran"""
+    from .extract import error_record
+    from .fetch import scrape_all
+
+    owner = owner or default_owner(shard)
+    done = 0
+    while True:
+        leased = queue.lease(run_datetime, owner, shard, batch, lease_seconds)
+        if not leased:
+            return done
+        batch_catalog = {}
+        positions = {}
+        for position, product, retailer, url, attempts in leased:
+            if attempts > MAX_ATTEMPTS:
+                queue.complete(run_datetime, position,
+                               error_record(retailer, url, product, f'gave up after {MAX_ATTEMPTS} attempts'))
+                continue
+            batch_catalog.setdefault(product, {})[retailer] = url
+            positions[product, retailer] = position
+
+        def on_result(product, retailer, row):
+            queue.complete(run_datetime, positions[product, retailer], row)
+
+        done += len(scrape_all(batch_catalog, on_result=on_result))
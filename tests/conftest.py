@@ -0,0 +1,58 @@
+"""Shared fixtures: an isolated working directory and the bench stand-in serving fixture pages"""
+
+import pandas as pd
+import pytest
+
+from bench.fixtures import synthetic_page
+from bench.standin import StandIn
+from scraper import fetch
+from scraper.normalize import StaticRateProvider, normalize_frame
+
+PRODUCTS = ['iPhone 17', 'iPad Air']
+RETAILERS = ['Apple', 'Sharaf DG', 'Argos', 'Verizon', 'AT&T']
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    """Run every test in an empty directory, so data/ paths, the cache and hints start fresh"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+@pytest.fixture
+def fixtures():
+    """Small synthetic pages for every product x retailer"""
+    return {(product, retailer): (synthetic_page(product, retailer, size=8 * 1024), True)
+            for product in PRODUCTS for retailer in RETAILERS}
+
+@pytest.fixture
+def fast_fetch(monkeypatch):
+    """No politeness sleeps or retry backoff for the loopback hosts the stand-in uses"""
+    monkeypatch.setattr(fetch, 'HOST_BUDGETS', {f'127.0.0.{index}': {'min_interval': 0} for index in range(1, 10)})
+    monkeypatch.setattr(fetch, 'BACKOFF_FACTOR', 0)
+    monkeypatch.setattr(fetch, 'BACKOFF_JITTER', 0)
+    monkeypatch.setattr(fetch, 'response_cache', fetch.ResponseCache())
+    fetch.reset_hosts()
+    yield
+    fetch.reset_hosts()
+
+@pytest.fixture
+def standin(fixtures, fast_fetch):
+    """Start a StandIn over the fixtures with the given settings; yields a factory"""
+    servers = []
+
+    def start(**settings):
+        server = StandIn(fixtures, **settings).__enter__()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.__exit__(None, None, None)
+
+def raw_row(product, retailer, price, rating=None, run_datetime='2026-01-01 08:00:00'):
+    """One scraped row as scrape_all returns it, stamped with its run"""
+    return {'Product': product, 'Retailer': retailer, 'Original Price': price, 'Rating': rating,
+            'URL': f'https://example.com/{retailer}/{product}', 'Run Datetime': run_datetime}
+
+def typed_run(rows):
+    """normalize_frame over raw rows at fixed exchange rates"""
+    return normalize_frame(pd.DataFrame(rows), StaticRateProvider({'USD': 1.0, 'GBP': 1.25, 'AED': 0.25}))
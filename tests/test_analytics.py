@@ -0,0 +1,38 @@
+from conftest import raw_row, typed_run
+from scraper.analytics import AnalyticsState
+from scraper.report import export_report, report_views
+
+def _runs():
+    return [
+        typed_run([raw_row('iPad Air', 'Argos (UK)', '£400.00', '4.5 out of 5', '2026-01-01 08:00:00'),
+                   raw_row('iPad Air', 'Verizon (US)', '$20.00/mo', None, '2026-01-01 08:00:00')]),
+        typed_run([raw_row('iPad Air', 'Argos (UK)', '£480.00', '127', '2026-01-02 08:00:00'),
+                   raw_row('iPad Air', 'Verizon (US)', 'Error: timeout', None, '2026-01-02 08:00:00')]),
+    ]
+
+def test_fold_keeps_running_stats_and_latest_rows():
+    state = AnalyticsState()
+    for run in _runs():
+        state.fold(run)
+    history = state.history_stats().set_index('Retailer')
+    assert history.loc['Argos (UK)', 'Min Price (USD)'] == 500.0
+    assert history.loc['Argos (UK)', 'Max Price (USD)'] == 600.0
+    assert history.loc['Argos (UK)', 'Runs with Price'] == 2
+    assert state.latest['iPad Air']['Verizon (US)']['status'] == 'error'
+    assert state.latest['iPad Air']['Argos (UK)']['review_count'] == 127
+
+def test_monthly_prices_stay_out_of_best_deals():
+    state = AnalyticsState().fold(_runs()[0])
+    assert state.best_deals() == {'iPad Air': ('Argos (UK)', 500.0)}
+    assert state.price_analysis().loc['iPad Air', 'Retailers with Price'] == 1
+
+def test_history_stats_are_exported(workdir):
+    state = AnalyticsState()
+    for run in _runs():
+        state.fold(run)
+    run = _runs()[1]
+    current = AnalyticsState().fold(run)
+    assert 'history' in report_views(run, current, state.history_stats())
+    written = export_report(run, current, 'out', ['csv'], history=state.history_stats())
+    assert any(path.endswith('_history.csv') for path in written)
+    assert export_report(run, current, 'out', ['csv'], history=state.history_stats()) == []
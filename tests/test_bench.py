@@ -0,0 +1,7 @@
+from bench.fixtures import CATALOG_FILE, load_fixtures
+from scraper.catalog import load_catalog
+
+def test_fixtures_cover_the_repository_catalog_from_any_directory(workdir):
+    fixtures = load_fixtures()
+    catalog = load_catalog(CATALOG_FILE)
+    assert set(fixtures) == {(product, retailer) for product, urls in catalog.items() for retailer in urls}
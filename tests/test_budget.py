@@ -0,0 +1,24 @@
+from scraper.fetch import HostBudget
+
+def test_a_failed_url_counts_once():
+    budget = HostBudget(min_interval=0, failure_threshold=3)
+    budget.record(status=503)
+    budget.record(status=503)
+    assert budget.allow()
+    budget.record(status=200, latency=0.1)
+    assert budget.failures == 0
+
+def test_breaker_opens_and_lets_one_probe_through():
+    budget = HostBudget(min_interval=0, failure_threshold=3, cooldown=0)
+    for _ in range(3):
+        budget.record()
+    assert budget.allow()
+    assert not budget.allow()
+    budget.record(status=200, latency=0.1)
+    assert budget.allow() and budget.allow()
+
+def test_breaker_stays_open_during_the_cooldown():
+    budget = HostBudget(min_interval=0, failure_threshold=2, cooldown=300)
+    budget.record(status=500)
+    budget.record(status=500)
+    assert not budget.allow()
@@ -0,0 +1,36 @@
+import json
+import os
+
+import pytest
+
+from scraper.cli import main, store_run
+from scraper.config import HISTORY_DIR
+from scraper.workqueue import WorkQueue
+
+CATALOG = {'iPad Air': {'Apple': 'https://www.apple.com/ipad-air/', 'Argos': 'https://www.argos.co.uk/ipad-air'}}
+
+@pytest.fixture
+def catalog_path(workdir):
+    path = workdir / 'catalog.json'
+    path.write_text(json.dumps(CATALOG))
+    return str(path)
+
+def test_unknown_product_exits_with_the_known_ones(catalog_path):
+    with pytest.raises(SystemExit, match=r"unknown products \['iPhone 99'\].*'iPad Air'"):
+        main(['enqueue', '--catalog', catalog_path, '--product', 'iPhone 99'])
+    assert not os.path.exists('data/queue.sqlite')
+
+def test_a_selection_without_urls_exits(catalog_path):
+    with pytest.raises(SystemExit, match='No URLs'):
+        main(['enqueue', '--catalog', catalog_path, '--product', 'iPad Air', '--retailer', 'Verizon'])
+
+def test_an_empty_run_stores_nothing():
+    assert store_run([], '2026-01-01 08:00:00') is None
+    assert not os.path.exists(HISTORY_DIR)
+
+def test_partial_merge_without_finished_urls_exits(catalog_path):
+    main(['enqueue', '--catalog', catalog_path])
+    with pytest.raises(SystemExit, match='no finished URLs'):
+        main(['merge', '--partial'])
+    queue = WorkQueue('data/queue.sqlite')
+    assert queue.counts(queue.open_run()) == {'pending': 2}
@@ -0,0 +1,54 @@
+from conftest import raw_row
+from scraper.analytics import AnalyticsState, rebuild_analytics
+from scraper.cli import store_run
+from scraper.config import ANALYTICS_PATH, HISTORY_DIR
+from scraper.delta import load_events, load_runs, snapshot_history
+from scraper.report import latest_run
+from scraper.store import read_history
+
+def _run(run_datetime, argos_price, verizon_rating='4.2 out of 5'):
+    return [
+        raw_row('iPad Air', 'Argos (UK)', argos_price, '127', run_datetime),
+        raw_row('iPad Air', 'Verizon (US)', '$20.00/mo', verizon_rating, run_datetime),
+        raw_row('iPad Air', 'Apple', '$599', None, run_datetime),
+    ]
+
+def test_delta_run_stores_only_changed_rows_and_emits_price_events(workdir):
+    store_run(_run('2026-01-01 08:00:00', '£499.00'), '2026-01-01 08:00:00', delta=True, refetch=False)
+    store_run(_run('2026-01-02 08:00:00', '£449.00'), '2026-01-02 08:00:00', delta=True, refetch=False)
+    store_run(_run('2026-01-03 08:00:00', '£449.00', '4.3 out of 5'), '2026-01-03 08:00:00', delta=True, refetch=False)
+
+    history = read_history(HISTORY_DIR)
+    assert len(history) == 3 + 1 + 1
+    assert [run['changed'] for run in load_runs()] == [3, 1, 1]
+    events = load_events()
+    assert [(event['retailer'], event['event'], event['old_price'], event['new_price']) for event in events] == [
+        ('Argos (UK)', 'price_drop', 499.0, 449.0)]
+
+def test_latest_run_of_a_delta_run_has_every_row(workdir):
+    store_run(_run('2026-01-01 08:00:00', '£499.00'), '2026-01-01 08:00:00', delta=True, refetch=False)
+    store_run(_run('2026-01-02 08:00:00', '£449.00'), '2026-01-02 08:00:00', delta=True, refetch=False)
+
+    run = latest_run(AnalyticsState.load(ANALYTICS_PATH))
+    assert len(run) == 3
+    assert set(run['run_datetime'].astype(str)) == {'2026-01-02 08:00:00'}
+    assert run.set_index('retailer').loc['Apple', 'original_price'] == '$599'
+
+    snapshot = snapshot_history(read_history(HISTORY_DIR), load_runs())
+    expected = snapshot[snapshot['run_datetime'] == run['run_datetime'].iloc[0]]
+    key = ['product', 'retailer']
+    assert (run.astype({'product': str, 'retailer': str}).sort_values(key)['original_price'].tolist()
+            == expected.astype({'product': str, 'retailer': str}).sort_values(key)['original_price'].tolist())
+
+def test_folded_state_matches_a_rebuild_from_history(workdir):
+    store_run(_run('2026-01-01 08:00:00', '£499.00'), '2026-01-01 08:00:00', delta=True, refetch=False)
+    store_run(_run('2026-01-02 08:00:00', '£449.00'), '2026-01-02 08:00:00', delta=True, refetch=False)
+    # A sparse run (merge --partial): only two of the keys, which do not span a full product x retailer grid
+    store_run([raw_row('iPad Air', 'Apple', '$599', None, '2026-01-03 08:00:00'),
+               raw_row('iPhone 17', 'Argos (UK)', '£799.00', '4.5 out of 5', '2026-01-03 08:00:00')],
+              '2026-01-03 08:00:00', delta=True, refetch=False)
+    folded = AnalyticsState.load(ANALYTICS_PATH)
+    rebuilt = rebuild_analytics(HISTORY_DIR)
+    assert rebuilt.latest == folded.latest
+    assert rebuilt.stats == folded.stats
+    assert load_runs()[-1]['keys'] == [['iPad Air', 'Apple'], ['iPhone 17', 'Argos (UK)']]
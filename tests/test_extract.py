@@ -0,0 +1,85 @@
+import hashlib
+import json
+
+from bench.fixtures import synthetic_page
+from scraper.extract import COMPILED_SPECS, extract_fields, stream_fields
+
+def _page(*documents):
+    scripts = ''.join(f'<script type="application/ld+json">{json.dumps(document)}</script>' for document in documents)
+    return f'<html><head>{scripts}</head><body><p>Nothing else here</p></body></html>'.encode()
+
+PRODUCT = {
+    '@context': 'https://schema.org',
+    '@type': 'Product',
+    'name': 'iPad Air',
+    'review': [{'@type': 'Review', 'reviewRating': {'@type': 'Rating', 'ratingValue': 1, 'bestRating': 5}}],
+    'offers': {'@type': 'Offer', 'price': '799.00', 'priceCurrency': 'GBP'},
+    'aggregateRating': {'@type': 'AggregateRating', 'ratingValue': 4.6, 'reviewCount': 210},
+}
+
+ACCESSORIES = {
+    '@context': 'https://schema.org',
+    '@type': 'ItemList',
+    'itemListElement': [{'@type': 'Product', 'name': 'Case',
+                         'offers': {'@type': 'Offer', 'price': '19.99', 'priceCurrency': 'GBP'}}],
+}
+
+def test_jsonld_uses_the_product_offer_and_aggregate_rating():
+    price, rating = extract_fields(_page(ACCESSORIES, PRODUCT), COMPILED_SPECS['Argos'])
+    assert price == '£799'
+    assert rating == '4.6 out of 5 (210 reviews)'
+
+def test_jsonld_graph_members_count_as_top_level():
+    graph = {'@context': 'https://schema.org', '@graph': [ACCESSORIES, {**PRODUCT, '@type': ['Product', 'Thing']}]}
+    assert extract_fields(_page(graph), COMPILED_SPECS['Argos']) == ('£799', '4.6 out of 5 (210 reviews)')
+
+def test_review_ratings_are_not_the_product_rating():
+    product = {key: value for key, value in PRODUCT.items() if key != 'aggregateRating'}
+    assert extract_fields(_page(product), COMPILED_SPECS['Argos']) == ('£799', None)
+
+def test_selectors_find_the_fixture_markup():
+    price, rating = extract_fields(synthetic_page('iPad Air', 'Sharaf DG', size=8 * 1024), COMPILED_SPECS['Sharaf DG'])
+    assert price.startswith('AED ')
+    assert rating.startswith('4.2')
+
+def _chunks(body, size=512):
+    return (body[start:start + size] for start in range(0, len(body), size))
+
+def test_stream_matches_tree_on_fixture_pages():
+    for retailer in ('Apple', 'Sharaf DG', 'Argos', 'Verizon', 'AT&T'):
+        body = synthetic_page('iPhone 17', retailer, size=64 * 1024)
+        spec = COMPILED_SPECS[retailer]
+        price, rating, size, body_hash = stream_fields(_chunks(body, 4096), spec, len(body))
+        assert (price, rating) == extract_fields(body, spec)
+        assert body_hash is None if size < len(body) else body_hash == hashlib.sha256(body).hexdigest()
+
+def test_stream_does_not_stop_on_a_lower_priority_hit():
+    body = (b'<html><body><p>Was \xc2\xa3999.00</p><span class="rating">4.5 out of 5</span>'
+            + b'<div>filler</div>' * 2000
+            + b'<span data-test="product-price">\xc2\xa3799.00</span></body></html>')
+    spec = COMPILED_SPECS['Argos']
+    price, rating, _, _ = stream_fields(_chunks(body), spec, len(body))
+    assert price == extract_fields(body, spec)[0] == '£799.00'
+    assert rating == '4.5 out of 5'
+
+def test_stream_stops_early_once_structured_data_is_found():
+    body = _page(PRODUCT).replace(b'</body>', b'<div>filler</div>' * 5000 + b'</body>')
+    price, rating, size, body_hash = stream_fields(_chunks(body), COMPILED_SPECS['Argos'], len(body))
+    assert (price, rating) == ('£799', '4.6 out of 5 (210 reviews)')
+    assert size < len(body) and body_hash is None
+
+def test_stream_stops_before_eof_without_structured_data():
+    for retailer in ('Apple', 'Sharaf DG', 'Argos'):
+        body = synthetic_page('iPad Air', retailer, size=256 * 1024)
+        price, _, size, body_hash = stream_fields(_chunks(body, 4096), COMPILED_SPECS[retailer], len(body))
+        assert price and size < len(body) * 2 // 3 and body_hash is None
+    # A span.price element step outranks Verizon's text hit and could still come later, so it reads on
+    body = synthetic_page('iPad Air', 'Verizon', size=256 * 1024)
+    assert stream_fields(_chunks(body, 4096), COMPILED_SPECS['Verizon'], len(body))[2] == len(body)
+
+def test_structured_data_outside_the_head_is_ignored_for_head_specs():
+    script = f'<script type="application/ld+json">{json.dumps(PRODUCT)}</script>'.encode()
+    body = b'<html><head></head><body><span data-test="product-price">\xc2\xa3849.00</span>' + script + b'</body></html>'
+    spec = COMPILED_SPECS['Argos']
+    assert extract_fields(body, spec)[0] == '\u00a3849.00'
+    assert stream_fields(_chunks(body), spec, len(body))[0] == '\u00a3849.00'
@@ -0,0 +1,97 @@
+import os
+
+import pandas as pd
+import pytest
+
+from scraper import fetch, metrics
+from scraper.normalize import normalize_frame
+
+def test_scrape_all_extracts_every_page(standin, fixtures):
+    server = standin()
+    rows = fetch.scrape_all(server.catalog(fixtures))
+    assert len(rows) == len(fixtures)
+    assert all(row['Original Price'] and not row['Original Price'].startswith('Error') for row in rows)
+
+def test_status_left_after_retries_is_an_error_row(standin, fixtures):
+    server = standin(outages={'AT&T': 503})
+    rows = fetch.scrape_all({'iPhone 17': server.catalog(fixtures)['iPhone 17']})
+    failed = [row for row in rows if row['Retailer'] == 'AT&T (US)']
+    assert [row['Original Price'] for row in failed] == ['Error: HTTP 503']
+    for row in rows:
+        row['Run Datetime'] = '2026-01-01 00:00:00'
+    typed = normalize_frame(pd.DataFrame(rows))
+    assert set(typed.loc[typed['retailer'] == 'AT&T (US)', 'status']) == {'error'}
+
+def test_retry_after_is_capped(monkeypatch):
+    monkeypatch.setattr(fetch, 'MAX_RETRY_AFTER', 5)
+    assert fetch.CappedRetry().parse_retry_after('86400') == 5
+    assert fetch.CappedRetry().parse_retry_after('2') == 2
+
+def test_stream_extract_gives_the_same_rows(standin, fixtures, monkeypatch):
+    server = standin()
+    catalog = server.catalog(fixtures)
+    rows = fetch.scrape_all(catalog)
+    monkeypatch.setattr(fetch, 'STREAM_EXTRACT', True)
+    monkeypatch.setattr(fetch, 'response_cache', fetch.ResponseCache('data/stream_cache'))
+    assert fetch.scrape_all(catalog) == rows
+
+def test_one_outage_url_per_product_does_not_open_the_breaker(standin, fixtures):
+    server = standin(outages={'AT&T': 503})
+    rows = fetch.scrape_all(server.catalog(fixtures))
+    assert [row['Original Price'] for row in rows if row['Retailer'] == 'AT&T (US)'] == ['Error: HTTP 503'] * 2
+
+def _cache_outcomes(catalog):
+    with metrics.RunMetrics() as run_metrics:
+        rows = fetch.scrape_all(catalog)
+    return rows, {trace['cache'] for trace in run_metrics.traces}
+
+def test_unchanged_pages_reuse_the_cached_rows(standin, fixtures):
+    server = standin()
+    catalog = server.catalog(fixtures)
+    rows, outcomes = _cache_outcomes(catalog)
+    assert outcomes == {'miss'}
+
+    # The stand-in answers the stored ETag with a 304
+    assert _cache_outcomes(catalog) == (rows, {'not_modified'})
+
+    # Without validators the full body comes back, and its hash matches the stored one
+    for urls in catalog.values():
+        for url in urls.values():
+            entry = fetch.response_cache.lookup(url)
+            entry['etag'] = None
+            fetch.response_cache._write(url, entry)
+    assert _cache_outcomes(catalog) == (rows, {'unchanged'})
+    assert not [name for name in os.listdir(fetch.response_cache.directory) if name.endswith('.tmp')]
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    """Turns on pipeline mode with two extractor processes, shut down afterwards"""
+    def start():
+        monkeypatch.setattr(fetch, 'PARSE_WORKERS', 2)
+        return fetch.parse_pool()
+
+    yield start
+    if fetch._parse_pool is not None:
+        fetch._parse_pool.shutdown()
+        fetch._parse_pool = None
+
+def test_pipeline_mode_gives_the_same_rows(standin, fixtures, pipeline, monkeypatch):
+    catalog = standin().catalog(fixtures)
+    rows = fetch.scrape_all(catalog)
+    pipeline()
+    monkeypatch.setattr(fetch, 'response_cache', fetch.ResponseCache('data/pipeline_cache'))
+    with metrics.RunMetrics() as run_metrics:
+        assert fetch.scrape_all(catalog) == rows
+    # Extraction timings and tiers recorded in the worker processes land on each URL's trace
+    assert all({'parse_queue_wait', 'parse'} <= set(trace['timings']) and trace['price_tier']
+               for trace in run_metrics.traces)
+    assert all(trace['price_found'] for trace in run_metrics.traces)
+
+def test_a_failed_extractor_gives_an_error_row(pipeline):
+    pool = pipeline()
+    # A body the pool cannot hand to a worker fails the task the way a crashed worker does
+    data = pool.submit('Apple', 'https://www.apple.com/ipad-air/', 'iPad Air', lambda: None, lambda data: data)
+    assert data.result(timeout=60)['Original Price'].startswith('Error')
+    # Every queue slot is free again
+    for _ in range(fetch.PARSE_QUEUE_PER_WORKER * pool.workers):
+        assert pool._slots.acquire(blocking=False)
@@ -0,0 +1,39 @@
+import pytest
+
+from conftest import raw_row, typed_run
+from scraper.cli import build_parser
+from scraper.query import PriceIndex
+
+def _index():
+    rows = []
+    for day, argos, apple in (('01', '£499.00', '$599'), ('03', '£449.00', '$599'), ('08', '£399.00', '$579')):
+        run_datetime = f'2026-01-{day} 08:00:00'
+        rows += [raw_row('iPad Air', 'Argos (UK)', argos, run_datetime=run_datetime),
+                 raw_row('iPad Air', 'Apple', apple, run_datetime=run_datetime)]
+    return PriceIndex().fold(typed_run(rows))
+
+def test_series_window_and_daily_min():
+    index = _index()
+    assert [entry['day'] for entry in index.series_for('iPad Air', 'Argos', days=7)] == ['2026-01-03', '2026-01-08']
+    assert [entry['day'] for entry in index.series_for('iPad Air', 'Argos', days=7, end='2026-01-05')] == [
+        '2026-01-01', '2026-01-03']
+    assert [(row['day'], row['retailer']) for row in index.daily_min('iPad Air', days=30)] == [
+        ('2026-01-01', 'Apple'), ('2026-01-03', 'Argos (UK)'), ('2026-01-08', 'Argos (UK)')]
+
+def test_movers_compare_listed_prices():
+    movers = _index().movers(days=5, min_change=5.0)
+    assert [(row['retailer'], row['from_price'], row['to_price']) for row in movers] == [('Argos (UK)', 449.0, 399.0)]
+
+def test_saved_index_keeps_its_day_keys(tmp_path):
+    index = _index()
+    index.save(str(tmp_path / 'index.json'))
+    loaded = PriceIndex.load(str(tmp_path / 'index.json'))
+    assert loaded.days == index.days
+    assert loaded.movers(days=5) == index.movers(days=5)
+
+def test_bad_end_day_is_an_argument_error(capsys):
+    parser = build_parser()
+    assert parser.parse_args(['query', 'movers', '--end', '2026-01-08']).end == '2026-01-08'
+    with pytest.raises(SystemExit):
+        parser.parse_args(['query', 'movers', '--end', '2026-13-01'])
+    assert "invalid day '2026-13-01'" in capsys.readouterr().err
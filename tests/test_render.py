@@ -0,0 +1,110 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from bench.fixtures import synthetic_page
+from bench.standin import StandIn
+from scraper import fetch, render
+
+URL = 'http://127.0.0.1:8000/ipad-air'
+
+class FakePool:
+    def __init__(self, status=200):
+        self.status, self.body = status, synthetic_page('iPad Air', 'Apple', size=8 * 1024)
+
+    def render(self, url, price_pattern):
+        return self.body, True, self.status
+
+@pytest.fixture
+def probing(fast_fetch):
+    """The URL's host with its breaker open and cooled down, and the half-open probe taken"""
+    budget = fetch.host_budget(URL)
+    budget.failures = budget.failure_threshold
+    budget._open_until = time.monotonic() - 1
+    assert budget.allow()
+    return budget
+
+def test_rendered_page_settles_the_probe(probing, monkeypatch):
+    monkeypatch.setattr(render, 'browser_pool', lambda user_agent: FakePool())
+    assert fetch._rendered('Apple', URL, 'iPad Air')['Original Price'].startswith('$')
+    assert probing.allow() and probing.failures == 0
+
+def test_failed_render_reopens_the_breaker(probing, monkeypatch):
+    def broken(user_agent):
+        raise TimeoutError('navigation timed out')
+
+    monkeypatch.setattr(render, 'browser_pool', broken)
+    assert fetch._rendered('Apple', URL, 'iPad Air')['Original Price'].startswith('Error')
+    assert not probing.allow()
+    probing._open_until = time.monotonic() - 1
+    assert probing.allow()
+
+def test_rendered_error_status_is_an_error_row(probing, monkeypatch):
+    monkeypatch.setattr(render, 'browser_pool', lambda user_agent: FakePool(status=503))
+    assert fetch._rendered('Apple', URL, 'iPad Air')['Original Price'] == 'Error: HTTP 503'
+    assert not probing.allow()
+
+def test_browser_launch_failure_disables_the_tier_once(monkeypatch, capsys):
+    launches = []
+
+    class Unlaunchable:
+        def __init__(self, user_agent):
+            launches.append(user_agent)
+            raise RuntimeError('Executable does not exist')
+
+    monkeypatch.setattr(render, 'BrowserPool', Unlaunchable)
+    monkeypatch.setattr(render, '_pool', None)
+    monkeypatch.setattr(render, '_pool_unavailable', False)
+    assert render.browser_pool('agent') is None
+    assert render.browser_pool('agent') is None
+    assert len(launches) == 1
+    assert capsys.readouterr().out.count('Rendering tier unavailable') == 1
+
+@pytest.fixture
+def hinted(monkeypatch, fast_fetch):
+    """Rendering on, with the hints of a URL last checked the given number of days ago"""
+    monkeypatch.setattr(render, 'RENDER_ENABLED', True)
+    monkeypatch.setattr(render, '_hints', None)
+    monkeypatch.setattr(render, 'browser_pool', lambda user_agent: FakePool())
+
+    def hint(url, days_ago):
+        checked = (datetime.now() - timedelta(days=days_ago)).strftime("%Y-%m-%d %H:%M:%S")
+        render.render_hints()[url] = {'retailer': 'Apple', 'since': checked, 'checked': checked}
+    return hint
+
+def _serve(body):
+    return StandIn({('iPad Air', 'Apple'): (body, True)}).__enter__()
+
+def test_a_hinted_page_goes_to_the_browser_until_its_recheck(hinted):
+    server = _serve(b'<html><body>Loading...</body></html>')
+    url = server.url('iPad Air', 'Apple')
+    hinted(url, days_ago=1)
+    try:
+        (row,) = fetch.scrape_all({'iPad Air': {'Apple': url}})
+    finally:
+        server.__exit__(None, None, None)
+    assert row['Original Price'].startswith('$') and server.requests == 0
+
+def test_a_recheck_drops_the_hint_once_the_static_page_has_the_price(hinted):
+    server = _serve(synthetic_page('iPad Air', 'Apple', size=8 * 1024))
+    url = server.url('iPad Air', 'Apple')
+    hinted(url, days_ago=render.RENDER_RECHECK_DAYS)
+    try:
+        (row,) = fetch.scrape_all({'iPad Air': {'Apple': url}})
+    finally:
+        server.__exit__(None, None, None)
+    assert row['Original Price'].startswith('$') and server.requests == 1
+    assert url not in render.render_hints()
+
+def test_a_failed_recheck_renders_and_restarts_the_clock(hinted):
+    server = _serve(b'<html><body>Loading...</body></html>')
+    url = server.url('iPad Air', 'Apple')
+    hinted(url, days_ago=render.RENDER_RECHECK_DAYS)
+    try:
+        (row,) = fetch.scrape_all({'iPad Air': {'Apple': url}})
+    finally:
+        server.__exit__(None, None, None)
+    assert row['Original Price'].startswith('$') and server.requests == 1
+    assert not render._recheck_due(render.render_hints()[url])
+    assert render.wants_render('Apple', url)
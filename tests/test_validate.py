@@ -0,0 +1,66 @@
+import json
+
+import pandas as pd
+
+from conftest import raw_row, typed_run
+from scraper.analytics import AnalyticsState
+from scraper.cli import main, store_run
+from scraper.config import ANALYTICS_PATH, HISTORY_DIR, QUARANTINE_PATH
+from scraper.query import PriceIndex
+from scraper.store import read_history
+from scraper.validate import check_run
+
+def _history(*prices):
+    rows = [raw_row('iPad Air', 'Argos (UK)', price, run_datetime=f'2026-01-0{day} 08:00:00')
+            for day, price in enumerate(prices, start=1)]
+    return PriceIndex().fold(typed_run(rows))
+
+def test_currency_comes_from_the_price_text():
+    run = typed_run([raw_row('iPad Air', 'Argos (UK)', '$799.00'), raw_row('iPad Air', 'Apple', 'USD 599'),
+                     raw_row('iPad Air', 'Sharaf DG (UAE)', 'AED 2,199'), raw_row('iPad Air', 'Argos (UK)', '799.00')])
+    assert run['currency'].astype(str).tolist() == ['USD', 'USD', 'AED', 'GBP']
+    assert run['price'].tolist() == [799.0, 599.0, 2199.0, 799.0]
+
+def test_price_in_the_wrong_currency_fails_the_spec_check():
+    run = typed_run([raw_row('iPad Air', 'Argos (UK)', '$799.00'), raw_row('iPad Air', 'Argos (UK)', '€799.00'),
+                     raw_row('iPad Air', 'Argos (UK)', '£799.00')])
+    assert {label: reasons for label, (reasons, _) in check_run(run, PriceIndex()).items()} == {
+        0: ['currency'], 1: ['currency']}
+
+def test_price_far_off_the_baseline_fails_the_range_check():
+    index = _history('£499.00', '£489.00', '£499.00')
+    run = typed_run([raw_row('iPad Air', 'Argos (UK)', '£49.90', run_datetime='2026-01-04 08:00:00')])
+    (reasons, base), = check_run(run, index).values()
+    assert reasons == ['range'] and base['median'] == 499.0
+    assert check_run(typed_run([raw_row('iPad Air', 'Argos (UK)', '£459.00')]), index) == {}
+
+def test_rows_still_failing_after_the_refetch_are_quarantined(workdir):
+    store_run([raw_row('iPad Air', 'Argos (UK)', '$799.00'), raw_row('iPad Air', 'Apple', '$599')],
+              '2026-01-01 08:00:00', delta=False, refetch=False)
+    with open(QUARANTINE_PATH, encoding='utf-8') as f:
+        (entry,) = [json.loads(line) for line in f]
+    assert (entry['retailer'], entry['currency'], entry['reasons']) == ('Argos (UK)', 'USD', ['currency'])
+    assert [row['retailer'] for row in PriceIndex.load().latest()] == ['Apple']
+
+def test_refetch_replaces_a_suspicious_row(standin, fixtures, workdir):
+    server = standin()
+    url = server.catalog(fixtures)['iPhone 17']['Argos']
+    row = {**raw_row('iPhone 17', 'Argos (UK)', '$799.00'), 'URL': url}
+    store_run([row], '2026-01-01 08:00:00', delta=False, refetch=True)
+    (latest,) = PriceIndex.load().latest()
+    assert latest['currency'] == 'GBP'
+    assert not (workdir / QUARANTINE_PATH).exists()
+
+def test_renormalize_keeps_quarantined_rows_out(workdir):
+    for day in range(1, 5):
+        store_run([raw_row('iPad Air', 'Argos (UK)', '£599.00', run_datetime=f'2026-01-0{day} 08:00:00')],
+                  f'2026-01-0{day} 08:00:00', refetch=False)
+    store_run([raw_row('iPad Air', 'Argos (UK)', '£59900.00', run_datetime='2026-01-05 08:00:00')],
+              '2026-01-05 08:00:00', refetch=False)
+
+    main(['renormalize'])
+    history = read_history(HISTORY_DIR)
+    outlier = history[history['original_price'] == '£59900.00'].iloc[0]
+    assert outlier['status'] == 'quarantined' and pd.isna(outlier['price']) and pd.isna(outlier['price_usd'])
+    stats = AnalyticsState.load(ANALYTICS_PATH).history_stats().iloc[0]
+    assert stats['Runs with Price'] == 4 and stats['Max Price (USD)'] == stats['Min Price (USD)']
@@ -0,0 +1,96 @@
+import json
+from urllib.parse import urlsplit
+
+import pytest
+
+from conftest import raw_row
+from scraper.cli import main, store_run
+from scraper.metrics import RunMetrics
+from scraper.workqueue import WorkQueue, parse_shard, work
+
+CATALOG = {
+    product: {retailer: f'https://{host}/{product}' for retailer, host in (
+        ('Apple', 'www.apple.com'), ('Argos', 'www.argos.co.uk'), ('Verizon', 'www.verizon.com'),
+        ('AT&T', 'www.att.com'), ('Sharaf DG', 'uae.sharafdg.com'))}
+    for product in ('iPhone 17', 'iPad Air', 'MacBook Air')
+}
+
+def _hosts(leased):
+    return {urlsplit(url).hostname for _, _, _, url, _ in leased}
+
+def test_shards_split_hosts_evenly(workdir):
+    queue = WorkQueue('queue.sqlite')
+    hosts = {urlsplit(url).hostname for urls in CATALOG.values() for url in urls.values()}
+    for count in range(1, 6):
+        run = queue.enqueue(CATALOG, f'2026-01-0{count} 08:00:00')
+        assert queue.host_count(run) == 5
+        shards = [_hosts(queue.lease(run, f'worker-{index}', (index, count), limit=100)) for index in range(count)]
+        assert set().union(*shards) == hosts and sum(len(shard) for shard in shards) == 5
+        assert max(map(len, shards)) - min(map(len, shards)) <= 1
+
+def test_leases_resume_and_expire(workdir):
+    queue = WorkQueue('queue.sqlite')
+    run = queue.enqueue(CATALOG, '2026-01-01 08:00:00')
+    first = queue.lease(run, 'a', limit=4)
+    queue.complete(run, first[0][0], {'row': 0})
+    # A restarted owner gets its unfinished leases back; another owner does not until they expire
+    assert [task[0] for task in queue.lease(run, 'a', limit=3)] == [task[0] for task in first[1:]]
+    assert [task[0] for task in queue.lease(run, 'b', limit=100)] == list(range(4, 15))
+    assert queue.lease(run, 'c', limit=100) == []
+    expired = queue.lease(run, 'a', limit=100, lease_seconds=-1)
+    assert [task[0] for task in queue.lease(run, 'c', limit=100)] == [task[0] for task in expired]
+    assert queue.counts(run) == {'done': 1, 'leased': 14}
+
+def test_merge_deletes_the_run_tasks_and_absorb_skips_merged_runs(workdir):
+    remote = WorkQueue('remote.sqlite')
+    run = remote.enqueue(CATALOG, '2026-01-01 08:00:00')
+    for position, *_ in remote.lease(run, 'remote', limit=100):
+        remote.complete(run, position, {'position': position})
+    remote.close()
+
+    queue = WorkQueue('queue.sqlite')
+    assert queue.absorb('remote.sqlite') == 15
+    assert len(queue.results(run)) == 15
+    queue.mark_merged(run)
+    assert queue.counts(run) == {} and queue.is_merged(run)
+    assert queue.absorb('remote.sqlite') == 0
+
+def test_parse_shard_rejects_bad_input():
+    assert parse_shard('1/4') == (1, 4)
+    for text in ('4/4', 'x', '1-4'):
+        try:
+            parse_shard(text)
+        except ValueError:
+            continue
+        raise AssertionError(text)
+
+def test_sharded_workers_write_shard_metric_lines(standin, fixtures, workdir):
+    server = standin()
+    queue = WorkQueue('queue.sqlite')
+    run = queue.enqueue(server.catalog(fixtures), '2026-01-01 08:00:00')
+    done = 0
+    for shard in ('0/2', '1/2'):
+        with RunMetrics() as run_metrics:
+            done += work(queue, run, parse_shard(shard))
+        run_metrics.write(run, 'metrics.jsonl', shard=shard)
+    assert done == len(fixtures) == len(queue.results(run))
+    with open('metrics.jsonl', encoding='utf-8') as f:
+        lines = [json.loads(line) for line in f]
+    assert {line['type'] for line in lines} == {'url', 'shard'}
+    assert all('shard' in line for line in lines)
+
+def test_more_shards_than_hosts_is_refused(workdir):
+    WorkQueue('data/queue.sqlite').enqueue(CATALOG, '2026-01-01 08:00:00')
+    with pytest.raises(SystemExit, match='at most 5 shards'):
+        main(['work', '--shard', '0/6'])
+
+def test_merging_a_run_older_than_the_stored_one_is_refused(workdir):
+    queue = WorkQueue('data/queue.sqlite')
+    run = queue.enqueue({'iPad Air': {'Apple': 'https://www.apple.com/ipad-air/'}}, '2026-01-01 09:00:00')
+    (position, *_), = queue.lease(run, 'worker')
+    queue.complete(run, position, raw_row('iPad Air', 'Apple', '$599'))
+    store_run([raw_row('iPad Air', 'Apple', '$579', run_datetime='2026-01-01 10:00:00')], '2026-01-01 10:00:00',
+              refetch=False)
+    with pytest.raises(SystemExit, match='not newer than the latest stored run 2026-01-01 10:00:00'):
+        main(['merge', '--run', run])
+    assert not queue.is_merged(run) and queue.counts(run) == {'done': 1}